@@ -0,0 +1,78 @@
+"""Time the render path against recorded Open-Meteo responses
+
+Record fixtures once (needs network), then replay them offline:
+
+    python benchmark.py --record Berlin Tokyo "New York"
+    python benchmark.py Berlin Tokyo "New York" > bench_output.txt
+
+Replay has no network latency and skips the rate limiter, so the timings
+cover only parsing, figure building and serialization.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import orjson
+import plotly.io as pio
+
+import weather_transport
+from weather_transport import RecordingTransport, ReplayTransport
+
+DEFAULT_CITIES = ["London", "New York", "Tokyo", "Sydney", "Paris"]
+
+
+def timed(func, repeat):
+    """Median wall time of func in milliseconds, and its last result"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cities", nargs="*", default=DEFAULT_CITIES)
+    parser.add_argument("--fixtures", default=os.environ.get("WEATHER_FIXTURES", weather_transport.DEFAULT_FIXTURE_DIR))
+    parser.add_argument("--record", action="store_true", help="fetch from Open-Meteo and save fixtures")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        weather_transport.set_transport(RecordingTransport(args.fixtures))
+    else:
+        weather_transport.set_transport(ReplayTransport(args.fixtures))
+
+    # Imported after the transport is set so nothing reaches upstream by accident
+    from weather_app_dash import render_weather
+    from weather_cache import weather_cache
+    from weather_core import get_city_forecasts
+
+    if args.record:
+        forecasts = get_city_forecasts(args.cities)
+        missing = [city for city, forecast in zip(args.cities, forecasts) if forecast is None]
+        print(f"Recorded {len(args.cities) - len(missing)} cities to {args.fixtures}")
+        if missing:
+            print(f"Not found: {', '.join(missing)}")
+        return
+
+    def fetch():
+        weather_cache.clear()
+        return get_city_forecasts(args.cities)
+
+    fetch_ms, forecasts = timed(fetch, args.repeat)
+    pairs = [(city, forecast) for city, forecast in zip(args.cities, forecasts) if forecast is not None]
+    render_ms, views = timed(lambda: [render_weather(city, forecast) for city, forecast in pairs], args.repeat)
+    dash_ms, _ = timed(lambda: [pio.json.to_json_plotly(view) for view in views], args.repeat)
+    api_ms, _ = timed(lambda: [orjson.dumps(forecast) for _, forecast in pairs], args.repeat)
+
+    print(f"{len(pairs)} cities, median of {args.repeat} runs")
+    for stage, ms in [("fetch + parse", fetch_ms), ("render", render_ms),
+                      ("serialize (Dash)", dash_ms), ("serialize (API)", api_ms)]:
+        print(f"{stage:<18} {ms:9.2f} ms  {ms / max(len(pairs), 1):8.2f} ms/city")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# pytest loads this file from the repository root, which also puts the flat
+# weather_* modules on sys.path for the tests under tests/
+
+import pytest
+
+import weather_core
+import weather_transport
+from weather_cache import weather_cache
+from weather_transport import DEFAULT_FIXTURE_DIR, ReplayTransport
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    """Answer upstream calls from the recorded fixtures, starting from an empty cache
+
+    The rate limiter must never be reached in replay mode, so touching it fails the test.
+    """
+    def no_limiter(timeout):
+        raise AssertionError("Replayed requests must bypass the rate limiter")
+
+    monkeypatch.setattr(weather_transport, '_transport', ReplayTransport(DEFAULT_FIXTURE_DIR))
+    monkeypatch.setattr(weather_core._rate_limiter, 'acquire', no_limiter)
+    weather_cache.clear()
+    yield
+    weather_cache.clear()
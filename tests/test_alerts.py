@@ -0,0 +1,61 @@
+import pytest
+
+import weather_alerts
+from weather_alerts import AlertEngine
+
+
+def hourly(temperatures):
+    return {'hourly': {
+        'time': [f"2026-10-18T{h:02d}:00" for h in range(len(temperatures))],
+        'temperature_2m': temperatures,
+    }}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # No background refresh: these tests call evaluate() directly
+    monkeypatch.setattr(AlertEngine, '_run', lambda self: None)
+    return AlertEngine(sinks=[])
+
+
+def test_new_rule_sees_whole_forecast_once(engine):
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 0)
+    key = (1, 2)
+
+    alerts = engine.evaluate(key, hourly([-1, 3, -2]))
+    assert [a['time'] for a in alerts] == ['2026-10-18T00:00', '2026-10-18T02:00']
+    assert engine.evaluate(key, hourly([-1, 3, -2])) == []
+
+
+def test_only_changed_cells_are_compared(engine):
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 0)
+    engine.evaluate((1, 2), hourly([-1, 3, -2]))
+
+    alerts = engine.evaluate((1, 2), hourly([-1, -4, -2]))
+    assert [(a['time'], a['value']) for a in alerts] == [('2026-10-18T01:00', -4.0)]
+
+
+def test_rule_added_later_sees_unchanged_cells(engine):
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 0)
+    engine.evaluate((1, 2), hourly([-1, 3]))
+
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 5, name='chilly')
+    alerts = engine.evaluate((1, 2), hourly([-1, 3]))
+    assert {(a['name'], a['time']) for a in alerts} == {('chilly', '2026-10-18T00:00'), ('chilly', '2026-10-18T01:00')}
+
+
+def test_other_locations_are_ignored(engine):
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 0)
+    assert engine.evaluate((3, 4), hourly([-5])) == []
+    assert engine.locations() == [(1, 2)]
+
+
+def test_refresh_fetches_every_rule_location_in_one_batch(engine, monkeypatch):
+    batches = []
+    monkeypatch.setattr(weather_alerts, 'get_forecasts', batches.append)
+    engine.add_rule(1, 2, 'temperature_2m', '<=', 0)
+    engine.add_rule(1, 2, 'wind_gusts_10m', '>', 60)
+    engine.add_rule(3, 4, 'uv_index', '>', 7)
+
+    engine.refresh()
+    assert batches == [[(1, 2), (3, 4)]]
@@ -0,0 +1,96 @@
+import pytest
+
+from weather_cache import BoundedCache, approximate_size
+
+VALUE = b'x' * 100
+SIZE = approximate_size(VALUE)
+
+
+def keys(cache, namespace='ns'):
+    return sorted(key for ns, key in cache._entries if ns == namespace)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BoundedCache(max_bytes=3 * SIZE, policy='lru')
+    for key in 'abc':
+        cache.set('ns', key, VALUE)
+    cache.get('ns', 'a')
+
+    cache.set('ns', 'd', VALUE)
+    assert keys(cache) == ['a', 'c', 'd']
+    assert cache.stats()['namespaces']['ns']['evictions'] == 1
+
+
+def test_lfu_evicts_least_used_oldest_first():
+    cache = BoundedCache(max_bytes=3 * SIZE, policy='lfu')
+    for key in 'abc':
+        cache.set('ns', key, VALUE)
+    cache.get('ns', 'a')
+    cache.get('ns', 'a')
+
+    # b and c have no hits; b has gone unused longer
+    cache.set('ns', 'd', VALUE)
+    assert keys(cache) == ['a', 'c', 'd']
+    cache.set('ns', 'e', VALUE)
+    assert keys(cache) == ['a', 'd', 'e']
+
+
+def test_eviction_crosses_namespaces():
+    cache = BoundedCache(max_bytes=2 * SIZE)
+    cache.set('geocode', 'a', VALUE)
+    cache.set('forecast', 'b', VALUE)
+    cache.set('forecast', 'c', VALUE)
+
+    assert keys(cache, 'geocode') == []
+    assert cache.stats()['namespaces']['geocode']['evictions'] == 1
+
+
+def test_accounting_after_overwrite_pop_and_clear():
+    cache = BoundedCache(max_bytes=10 * SIZE)
+    cache.set('ns', 'a', VALUE)
+    cache.set('ns', 'a', VALUE)
+    cache.set('ns', 'b', VALUE)
+    cache.set('other', 'c', VALUE)
+
+    stats = cache.stats()
+    assert stats['resident_bytes'] == 3 * SIZE
+    assert (stats['namespaces']['ns']['entries'], stats['namespaces']['ns']['bytes']) == (2, 2 * SIZE)
+
+    assert cache.pop('ns', 'a') == VALUE
+    assert cache.pop('ns', 'a') is None
+    assert cache.stats()['resident_bytes'] == 2 * SIZE
+
+    cache.clear('ns')
+    stats = cache.stats()
+    assert stats['resident_bytes'] == SIZE
+    assert (stats['namespaces']['ns']['entries'], stats['namespaces']['ns']['bytes']) == (0, 0)
+
+    cache.clear()
+    assert cache.stats()['resident_bytes'] == 0
+
+
+def test_oversize_entry_is_rejected_and_counted():
+    cache = BoundedCache(max_bytes=2 * SIZE)
+    cache.set('ns', 'a', VALUE)
+
+    # Replacing a key with an oversize value drops the old value too
+    cache.set('ns', 'a', VALUE * 3)
+    assert cache.get('ns', 'a') is None
+    stats = cache.stats()
+    assert stats['resident_bytes'] == 0
+    assert stats['namespaces']['ns']['evictions'] == 1
+
+
+def test_stats_hit_ratio():
+    cache = BoundedCache()
+    assert cache.stats()['namespaces'] == {}
+
+    cache.set('ns', 'a', VALUE)
+    for key in ('a', 'a', 'a', 'missing'):
+        cache.get('ns', key)
+    assert cache.stats()['namespaces']['ns']['hit_ratio'] == 0.75
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedCache(policy='fifo')
@@ -0,0 +1,17 @@
+from benchmark import DEFAULT_CITIES
+from weather_compare import compare_forecasts, comparison_heatmap
+from weather_core import get_city_forecasts
+from weather_units import convert_forecast
+
+
+def test_comparison_follows_units(replay):
+    metric = get_city_forecasts(DEFAULT_CITIES)
+    imperial = [convert_forecast(f, 'imperial') for f in metric]
+
+    table = compare_forecasts(imperial, units='imperial')
+    assert list(table.columns) == ['City', 'Min Temp (°F)', 'Max Temp (°F)', 'Total Precip (in)', 'Peak UV',
+                                   'Max Gust (mph)']
+    assert table['Max Temp (°F)'].iloc[0] == round(max(metric[0].daily['temperature_2m_max']) * 9 / 5 + 32, 1)
+
+    heatmap = comparison_heatmap(imperial, 'wind_gusts_10m_max', units='imperial')
+    assert heatmap.layout.title.text == 'Wind Gusts (mph) by City'
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+import weather_core
+from weather_cache import weather_cache
+from weather_core import CircuitBreaker, SingleFlight, TokenBucket, UpstreamUnavailable, get_city_forecasts
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=2, latency_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success(0)
+    assert breaker.allow()
+
+
+def test_breaker_counts_slow_calls_as_failures():
+    breaker = CircuitBreaker(failure_threshold=1, latency_threshold=1, reset_timeout=60)
+    breaker.record_success(5)
+    assert not breaker.allow()
+
+
+def test_breaker_trips_for_retry_after():
+    breaker = CircuitBreaker(failure_threshold=5, latency_threshold=1, reset_timeout=0)
+    breaker.trip(60)
+    assert not breaker.allow()
+
+
+def test_token_bucket_refuses_beyond_burst_without_waiting():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.acquire(0) for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_serves_waiting_callers_in_time():
+    bucket = TokenBucket(rate=50, capacity=1)
+    bucket.acquire(0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(bucket.acquire(0.5))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Ten reserved tokens at 50/s take 0.2 s, so nobody runs out of patience
+    assert results == [True] * 10
+
+
+def test_batch_geocode_failure_is_a_miss_for_that_city(monkeypatch):
+    def get_location(city, wait=None):
+        if city == 'Down':
+            raise UpstreamUnavailable("Outbound rate limit exceeded")
+        return {'latitude': 1.0, 'longitude': 2.0, 'country': 'X', 'timezone': 'UTC'}
+
+    entry = ({'timezone': 'UTC', 'current': {}, 'daily': {}, 'hourly': {}}, 0, time.time() + 60)
+    monkeypatch.setattr(weather_core, 'get_location', get_location)
+    monkeypatch.setattr(weather_core, 'get_forecasts', lambda locations: [entry] * len(locations))
+
+    forecasts = get_city_forecasts(['Up', 'Down'])
+    assert forecasts[0].city == 'Up' and forecasts[1] is None
+    with pytest.raises(UpstreamUnavailable):
+        get_city_forecasts(['Down', 'Down'])
+
+
+def test_single_flight_joins_concurrent_calls():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('key', slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flights.do('key', slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert calls == [1]
+    assert results == ['result'] * 4
+
+
+def test_single_flight_reuses_result_within_window():
+    flights = SingleFlight(window=60)
+    calls = []
+
+    assert flights.do('key', lambda: calls.append(1) or len(calls)) == 1
+    assert flights.do('key', lambda: calls.append(1) or len(calls)) == 1
+    assert flights.do('other', lambda: calls.append(1) or len(calls)) == 2
+
+
+def test_single_flight_does_not_reuse_failures():
+    flights = SingleFlight(window=60)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do('key', fail)
+    assert flights.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_outage_serves_cached_cities_and_leaves_the_rest_empty(monkeypatch):
+    locations = {'London': {'latitude': 51.5, 'longitude': -0.1, 'country': 'UK', 'timezone': 'UTC'},
+                 'Paris': {'latitude': 48.9, 'longitude': 2.3, 'country': 'FR', 'timezone': 'UTC'}}
+
+    def unavailable(chunk, params):
+        raise UpstreamUnavailable("Circuit breaker is open")
+
+    monkeypatch.setattr(weather_core, 'get_location', lambda city, wait=None: locations[city])
+    monkeypatch.setattr(weather_core, '_get_batch', unavailable)
+    weather_cache.clear()
+    weather_core._forecast_cache.set((51.5, -0.1), ({'timezone': 'UTC', 'current': {}, 'daily': {}, 'hourly': {}}, 0, 0))
+
+    forecasts = get_city_forecasts(['London', 'Paris'])
+    assert forecasts[0].stale and forecasts[1] is None
+    with pytest.raises(UpstreamUnavailable):
+        get_city_forecasts(['Paris'])
+    weather_cache.clear()
+
+
+def test_empty_city_list_needs_no_lookup():
+    assert get_city_forecasts([]) == []
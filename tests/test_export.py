@@ -0,0 +1,100 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import weather_export
+from benchmark import DEFAULT_CITIES
+from weather_api import create_app
+from weather_core import UpstreamUnavailable
+from weather_export import export_forecasts
+
+
+@pytest.fixture
+def chunked(replay, monkeypatch):
+    """Export in chunks of two cities, with retries that do not sleep"""
+    monkeypatch.setattr(weather_export, 'EXPORT_CHUNK_SIZE', 2)
+    monkeypatch.setattr(weather_export, 'EXPORT_RETRY_DELAY', 0)
+
+
+def fail_after_first_chunk(monkeypatch, failures):
+    """Make every chunk after the first raise UpstreamUnavailable `failures` times before succeeding"""
+    calls = []
+    fetch = weather_export.get_city_forecasts
+
+    def flaky(chunk):
+        calls.append(chunk)
+        if len(calls) > 1 and sum(c == chunk for c in calls) <= failures:
+            raise UpstreamUnavailable("Circuit breaker is open")
+        return fetch(chunk)
+
+    monkeypatch.setattr(weather_export, 'get_city_forecasts', flaky)
+    return calls
+
+
+def test_csv_export_from_fixtures(chunked):
+    frame = pd.read_csv(io.BytesIO(b''.join(export_forecasts(DEFAULT_CITIES, 'daily'))))
+    assert frame['city'].unique().tolist() == DEFAULT_CITIES
+    assert len(frame) == 7 * len(DEFAULT_CITIES)
+    assert frame.drop_duplicates('city')['timezone'].tolist() == [
+        'Europe/London', 'America/New_York', 'Asia/Tokyo', 'Australia/Sydney', 'Europe/Paris']
+    assert 'temperature_2m_max_celsius' in frame and 'uv_index_max' in frame
+
+
+def test_parquet_columns_name_their_units(chunked):
+    metric = pq.read_table(io.BytesIO(b''.join(export_forecasts(DEFAULT_CITIES, 'daily', fmt='parquet'))))
+    imperial = pq.read_table(io.BytesIO(b''.join(export_forecasts(DEFAULT_CITIES, 'daily', 'imperial', 'parquet'))))
+
+    assert imperial.column_names == [
+        'city', 'country', 'latitude', 'longitude', 'timezone', 'time', 'temperature_2m_max_fahrenheit',
+        'temperature_2m_min_fahrenheit', 'precipitation_sum_inch', 'precipitation_probability_max',
+        'uv_index_max', 'wind_gusts_10m_max_mph']
+    celsius = metric.column('temperature_2m_max_celsius').to_numpy()
+    fahrenheit = imperial.column('temperature_2m_max_fahrenheit').to_numpy()
+    assert abs(fahrenheit - (celsius * 9 / 5 + 32)).max() < 0.1
+
+
+def test_later_chunk_is_retried(chunked, monkeypatch):
+    calls = fail_after_first_chunk(monkeypatch, failures=1)
+
+    frame = pd.read_csv(io.BytesIO(b''.join(export_forecasts(DEFAULT_CITIES, 'daily'))))
+    assert frame['city'].unique().tolist() == DEFAULT_CITIES
+    assert len(calls) == 5
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_failure_after_first_chunk_leaves_export_unfinished(chunked, monkeypatch, fmt):
+    fail_after_first_chunk(monkeypatch, failures=weather_export.EXPORT_RETRIES + 1)
+
+    chunks = export_forecasts(DEFAULT_CITIES, 'daily', fmt=fmt)
+    received = next(chunks)
+    with pytest.raises(UpstreamUnavailable):
+        for chunk in chunks:
+            received += chunk
+
+    if fmt == 'parquet':
+        # No footer was sent, so the partial download is not a valid file
+        with pytest.raises(pa.ArrowInvalid):
+            pq.read_table(io.BytesIO(received))
+
+
+def test_api_aborts_stream_after_first_chunk(chunked, monkeypatch):
+    fail_after_first_chunk(monkeypatch, failures=weather_export.EXPORT_RETRIES + 1)
+    client = create_app().test_client()
+
+    response = client.get('/weather/export', query_string={'city': DEFAULT_CITIES, 'section': 'daily'},
+                          buffered=False)
+    assert response.status_code == 200
+    with pytest.raises(UpstreamUnavailable):
+        b''.join(response.response)
+
+
+def test_api_answers_503_when_first_chunk_fails(chunked, monkeypatch):
+    def unavailable(chunk):
+        raise UpstreamUnavailable("Circuit breaker is open")
+
+    monkeypatch.setattr(weather_export, 'get_city_forecasts', unavailable)
+    response = create_app().test_client().get('/weather/export', query_string={'city': DEFAULT_CITIES})
+    assert response.status_code == 503
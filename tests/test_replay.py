@@ -0,0 +1,58 @@
+import plotly.io as pio
+import pytest
+
+from benchmark import DEFAULT_CITIES
+from weather_app_dash import render_weather
+from weather_core import UpstreamUnavailable, get_city_forecast, get_city_forecasts
+
+
+def rendered_text(view):
+    return pio.json.to_json_plotly(view)
+
+
+def test_city_forecast_from_fixtures(replay):
+    forecast = get_city_forecast('London')
+
+    assert forecast.country == 'United Kingdom'
+    assert forecast.timezone == 'Europe/London'
+    assert len(forecast.daily['time']) == 7
+    assert len(forecast.hourly['time']) == 7 * 24
+    assert not forecast.stale
+
+
+def test_render_weather_from_fixtures(replay):
+    forecast = get_city_forecast('London')
+
+    metric = rendered_text(render_weather('London', forecast))
+    imperial = rendered_text(render_weather('London', forecast, 'imperial'))
+
+    assert 'London, United Kingdom' in metric
+    assert 'Temperature (°C)' in metric
+    assert 'Temperature (°F)' in imperial
+    # Rendering in other units leaves the cached forecast in metric
+    assert forecast.current['temperature_2m'] == get_city_forecast('London').current['temperature_2m']
+
+
+def test_batch_from_fixtures(replay):
+    forecasts = get_city_forecasts(DEFAULT_CITIES)
+
+    assert [f.city for f in forecasts] == DEFAULT_CITIES
+    assert len({(f.latitude, f.longitude) for f in forecasts}) == len(DEFAULT_CITIES)
+
+
+def test_batch_replays_whatever_is_already_cached(replay):
+    # London is cached, so the batch request asks upstream for the other four only
+    get_city_forecast('London')
+    forecasts = get_city_forecasts(DEFAULT_CITIES)
+
+    assert [f.city for f in forecasts] == DEFAULT_CITIES
+
+
+def test_unknown_city(replay):
+    assert get_city_forecast('Atlantis') is None
+    assert 'City not found' in rendered_text(render_weather('Atlantis', None))
+
+
+def test_missing_fixture_is_unavailable_upstream(replay):
+    with pytest.raises(UpstreamUnavailable):
+        get_city_forecast('Nowhere In Particular')
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from weather_solar import solar_times, utc_offsets
+
+
+def clock(value):
+    return pd.Timestamp(value).strftime('%H:%M')
+
+
+def test_london_midsummer_matches_noaa():
+    date = np.datetime64('2024-06-21')
+    sun = solar_times(51.5074, -0.1278, [date], utc_offsets([date], 'Europe/London'))
+
+    # NOAA solar calculator: 04:43 and 21:21 BST
+    assert clock(sun['sunrise'][0]) in ('04:42', '04:43', '04:44')
+    assert clock(sun['sunset'][0]) in ('21:20', '21:21', '21:22')
+    assert abs(sun['day_length'][0] - 16.64) < 0.05
+
+
+def test_polar_day_has_no_sunrise():
+    sun = solar_times(69.65, 18.96, [np.datetime64('2024-06-21')])
+    assert np.isnat(sun['sunrise'][0]) and np.isnat(sun['sunset'][0])
+    assert sun['day_length'][0] == 24
+
+
+def test_inputs_broadcast():
+    sun = solar_times([0, 30, 60], 0, np.datetime64('2024-03-20'))
+    assert sun['day_length'].shape == (3,)
+    # Near the equinox day length is about 12 hours everywhere
+    assert np.all(np.abs(sun['day_length'] - 12.1) < 0.2)
+
+
+def test_utc_offsets_follow_daylight_saving():
+    offsets = utc_offsets(np.array(['2024-01-15', '2024-07-15'], dtype='datetime64[D]'), 'Europe/Oslo')
+    assert offsets.tolist() == [60, 120]
@@ -0,0 +1,242 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import orjson
+import requests
+
+from weather_core import (FORECAST_TTL, HOURLY_VARIABLES, UpstreamUnavailable, add_refresh_listener, get_forecasts,
+                          location_key)
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+# Shorthands for common rules: (hourly variable, operator, threshold)
+PRESETS = {
+    'gusts': ('wind_gusts_10m', '>', 60),
+    'uv': ('uv_index', '>', 7),
+    'frost': ('temperature_2m', '<=', 0),
+}
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    rule_id: str
+    name: str
+    latitude: float
+    longitude: float
+    variable: str
+    operator: str
+    threshold: float
+
+
+class LogSink:
+    """Write each alert to the log"""
+
+    def __call__(self, alerts):
+        for alert in alerts:
+            logger.warning("Alert %(name)s: %(variable)s %(operator)s %(threshold)s "
+                           "at %(time)s (value %(value)s)", alert)
+
+
+class WebhookSink:
+    """POST batches of alerts as JSON to a local webhook without blocking the refresh"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _post(self, alerts):
+        try:
+            requests.post(self.url, data=orjson.dumps(alerts), timeout=self.timeout,
+                          headers={'Content-Type': 'application/json'})
+        except requests.RequestException:
+            logger.exception("Could not deliver %d alerts to %s", len(alerts), self.url)
+
+    def __call__(self, alerts):
+        self._executor.submit(self._post, alerts)
+
+
+class _RuleGroup:
+    """All rules for one location, variable and operator, with thresholds as an array"""
+
+    def __init__(self, rules, fresh):
+        self.rules = rules
+        self.thresholds = np.array([r.threshold for r in rules], dtype=float)
+        # Newly added rules have not seen the current forecast yet
+        self.fresh = np.array([r.rule_id in fresh for r in rules], dtype=bool)
+
+
+class AlertEngine:
+    """Evaluate threshold rules against hourly forecasts whenever a location is refreshed
+
+    Only cells whose value changed since the previous refresh are compared,
+    except for rules added since then, which see the whole forecast once.
+    Once a rule exists, a background thread refetches every rule location
+    each refresh interval, so rules fire even for locations nobody views.
+    """
+
+    def __init__(self, sinks=None, refresh_interval=FORECAST_TTL):
+        self.sinks = list(sinks) if sinks is not None else [LogSink()]
+        self.refresh_interval = refresh_interval
+        self._rules = {}
+        self._groups = {}
+        self._previous = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add_rule(self, lat, lon, variable, operator, threshold, name=None):
+        if variable not in HOURLY_VARIABLES:
+            raise ValueError(f"Unknown hourly variable: {variable}")
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator: {operator}")
+
+        with self._lock:
+            rule = AlertRule(
+                rule_id=str(next(self._ids)),
+                name=name or f"{variable} {operator} {threshold}",
+                latitude=lat,
+                longitude=lon,
+                variable=variable,
+                operator=operator,
+                threshold=float(threshold),
+            )
+            self._rules[rule.rule_id] = rule
+            self._rebuild(location_key(lat, lon), fresh={rule.rule_id})
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='weather-alerts', daemon=True)
+                self._thread.start()
+        return rule
+
+    def add_preset(self, lat, lon, preset, name=None):
+        variable, operator, threshold = PRESETS[preset]
+        return self.add_rule(lat, lon, variable, operator, threshold, name=name or preset)
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is not None:
+                self._rebuild(location_key(rule.latitude, rule.longitude))
+        return rule
+
+    def rules(self):
+        return list(self._rules.values())
+
+    def locations(self):
+        """Keys of every location that has at least one rule"""
+        with self._lock:
+            return list(self._groups)
+
+    def refresh(self):
+        """Fetch every rule location in one batched lookup; expired forecasts are refetched and evaluated"""
+        keys = self.locations()
+        if not keys:
+            return
+        try:
+            get_forecasts(keys)
+        except UpstreamUnavailable:
+            logger.warning("Alert refresh skipped: weather service unavailable")
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Alert refresh failed")
+            time.sleep(self.refresh_interval)
+
+    def _rebuild(self, key, fresh=()):
+        """Regroup the rules of one location; must be called with the lock held"""
+        fresh = set(fresh)
+        for group in self._groups.get(key, {}).values():
+            fresh.update(r.rule_id for r, f in zip(group.rules, group.fresh) if f)
+
+        by_group = defaultdict(list)
+        for rule in self._rules.values():
+            if location_key(rule.latitude, rule.longitude) == key:
+                by_group[(rule.variable, rule.operator)].append(rule)
+
+        if by_group:
+            self._groups[key] = {k: _RuleGroup(rules, fresh) for k, rules in by_group.items()}
+        else:
+            self._groups.pop(key, None)
+            self._previous.pop(key, None)
+
+    def evaluate(self, key, data):
+        """Refresh listener: compare changed hourly cells against every rule for this location"""
+        with self._lock:
+            groups = self._groups.get(key)
+            if not groups:
+                return []
+
+            hourly = data['hourly']
+            times = np.asarray(hourly['time'])
+            previous = self._previous.get(key)
+            columns = {v: np.asarray(hourly[v], dtype=float) for v, _ in groups}
+            changed = {v: _changed_cells(times, values, previous, v) for v, values in columns.items()}
+
+            alerts = []
+            for (variable, operator), group in groups.items():
+                mask = changed[variable]
+                if group.fresh.any():
+                    cells = np.arange(len(times))
+                    candidates = mask[None, :] | group.fresh[:, None]
+                elif mask.any():
+                    cells = np.flatnonzero(mask)
+                    candidates = True
+                else:
+                    continue
+
+                values = columns[variable][cells]
+                hits = OPERATORS[operator](values[None, :], group.thresholds[:, None]) & candidates
+                for row, col in zip(*np.nonzero(hits)):
+                    rule = group.rules[row]
+                    alerts.append({**asdict(rule), 'time': str(times[cells[col]]), 'value': float(values[col])})
+                group.fresh[:] = False
+
+            self._previous[key] = {'time': times, **columns}
+
+        if alerts:
+            for sink in self.sinks:
+                sink(alerts)
+        return alerts
+
+
+def _changed_cells(times, values, previous, variable):
+    """Boolean mask of cells that are new or whose value differs from the previous refresh"""
+    if previous is None or variable not in previous:
+        return np.ones(len(times), dtype=bool)
+
+    # ISO timestamps sort chronologically, so the previous grid can be searched directly
+    prev_times, prev_values = previous['time'], previous[variable]
+    idx = np.clip(np.searchsorted(prev_times, times), 0, len(prev_times) - 1)
+    seen = prev_times[idx] == times
+    old = prev_values[idx]
+    same = (old == values) | (np.isnan(old) & np.isnan(values))
+    return ~(seen & same)
+
+
+def _default_sinks():
+    sinks = [LogSink()]
+    webhook = os.environ.get('WEATHER_ALERT_WEBHOOK')
+    if webhook:
+        sinks.append(WebhookSink(webhook))
+    return sinks
+
+
+alert_engine = AlertEngine(_default_sinks())
+add_refresh_listener(alert_engine.evaluate)
@@ -0,0 +1,229 @@
+import hashlib
+from dataclasses import asdict
+from itertools import chain
+
+import orjson
+from flask import Blueprint, Flask, Response, request, stream_with_context
+
+from weather_alerts import PRESETS, alert_engine
+from weather_cache import weather_cache
+from weather_export import (EXPORT_FORMATS, EXPORT_SECTIONS, MAX_EXPORT_CITIES, export_filename,
+                            export_forecasts)
+from weather_live import live_updater
+from weather_core import (BREAKER_RESET_TIMEOUT, UpstreamUnavailable, get_city_forecast, get_city_forecasts,
+                          get_coordinates)
+from weather_units import UNIT_SYSTEMS
+
+MAX_BATCH_CITIES = 50
+
+weather_api = Blueprint("weather_api", __name__)
+
+
+def _json_response(payload, status=200):
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+
+
+def _error(status, message):
+    response = _json_response({"error": message}, status=status)
+    response.cache_control.no_store = True
+    return response
+
+
+@weather_api.errorhandler(UpstreamUnavailable)
+def upstream_unavailable(exc):
+    response = _error(503, "Weather service is temporarily unavailable")
+    response.retry_after = BREAKER_RESET_TIMEOUT
+    return response
+
+
+def _cached_response(etag, max_age, build_payload):
+    """Answer with 304 if the client already holds this ETag, otherwise serialize the payload"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = _json_response(build_payload())
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+@weather_api.route("/weather")
+def weather():
+    city = request.args.get("city", "").strip()
+    if not city:
+        return _error(400, "Missing 'city' query parameter")
+
+    forecast = get_city_forecast(city)
+    if forecast is None:
+        return _error(404, f"City not found: {city}")
+
+    # orjson serializes the Forecast dataclass natively, without an asdict() copy
+    return _cached_response(forecast.etag, forecast.max_age, lambda: forecast)
+
+
+@weather_api.route("/weather/batch", methods=["GET", "POST"])
+def weather_batch():
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        cities = body.get("cities", [])
+    else:
+        cities = request.args.getlist("city")
+
+    cities = [c.strip() for c in cities if isinstance(c, str) and c.strip()]
+    if not cities:
+        return _error(400, "Provide at least one city")
+    if len(cities) > MAX_BATCH_CITIES:
+        return _error(400, f"At most {MAX_BATCH_CITIES} cities per batch")
+
+    forecasts = get_city_forecasts(cities)
+
+    found = [f for f in forecasts if f is not None]
+    validators = "|".join(f.etag if f is not None else f"missing:{city}" for city, f in zip(cities, forecasts))
+    etag = hashlib.blake2b(validators.encode(), digest_size=12).hexdigest()
+    max_age = min((f.max_age for f in found), default=0)
+
+    def build_payload():
+        return {
+            "results": [
+                {"city": city, "forecast": f} if f is not None
+                else {"city": city, "error": "City not found"}
+                for city, f in zip(cities, forecasts)
+            ]
+        }
+
+    return _cached_response(etag, max_age, build_payload)
+
+
+@weather_api.route("/weather/export", methods=["GET", "POST"])
+def weather_export():
+    """Stream daily or hourly forecasts for many cities as CSV or Parquet"""
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        cities = body.get("cities", [])
+    else:
+        body = {}
+        cities = request.args.getlist("city")
+    options = {**request.args, **body}
+    section = options.get("section", "hourly")
+    fmt = options.get("format", "csv")
+    units = options.get("units", "metric")
+
+    cities = list(dict.fromkeys(c.strip() for c in cities if isinstance(c, str) and c.strip()))
+    if not cities:
+        return _error(400, "Provide at least one city")
+    if len(cities) > MAX_EXPORT_CITIES:
+        return _error(400, f"At most {MAX_EXPORT_CITIES} cities per export")
+    if section not in EXPORT_SECTIONS:
+        return _error(400, f"Unknown section: {section}")
+    if fmt not in EXPORT_FORMATS:
+        return _error(400, f"Unknown format: {fmt}")
+    if units not in UNIT_SYSTEMS:
+        return _error(400, f"Unknown units: {units}")
+
+    # Produce the first chunk before answering so an unavailable upstream
+    # still gets a 503 instead of an empty download. If a later chunk fails
+    # for good, the generator raises and the server drops the connection
+    # without the final chunk, so clients see an incomplete transfer rather
+    # than a short file.
+    chunks = export_forecasts(cities, section, units, fmt)
+    first = next(chunks)
+
+    response = Response(stream_with_context(chain([first], chunks)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename={export_filename(section, fmt)}"
+    response.cache_control.no_store = True
+    return response
+
+
+# Seconds between SSE keep-alive comments while no update arrives
+STREAM_KEEPALIVE = 15
+
+
+@weather_api.route("/weather/stream")
+def weather_stream():
+    """Server-sent events with the current conditions of a city each time the live updater refreshes"""
+    city = request.args.get("city", "").strip()
+    if not city:
+        return _error(400, "Missing 'city' query parameter")
+
+    lat, lon, _ = get_coordinates(city)
+    if lat is None:
+        return _error(404, f"City not found: {city}")
+
+    def events():
+        version, sent = 0, None
+        while True:
+            key = live_updater.watch(lat, lon)
+            latest = live_updater.current(key)
+            if latest is not None and latest is not sent:
+                current, updated_at = latest
+                payload = orjson.dumps({"city": city, "current": current, "updated_at": updated_at})
+                yield b"event: current\ndata: " + payload + b"\n\n"
+                sent = latest
+            else:
+                yield b": keep-alive\n\n"
+            version = live_updater.wait_for_update(version, STREAM_KEEPALIVE)
+
+    response = Response(events(), mimetype="text/event-stream")
+    response.cache_control.no_cache = True
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@weather_api.route("/alerts", methods=["GET"])
+def list_alerts():
+    return _json_response({"rules": [asdict(rule) for rule in alert_engine.rules()]})
+
+
+@weather_api.route("/alerts", methods=["POST"])
+def add_alert():
+    """Register a threshold rule, by preset or explicit variable/operator/threshold"""
+    body = request.get_json(silent=True) or {}
+
+    if "city" in body:
+        lat, lon, _ = get_coordinates(str(body["city"]))
+        if lat is None:
+            return _error(404, f"City not found: {body['city']}")
+    else:
+        try:
+            lat, lon = float(body["latitude"]), float(body["longitude"])
+        except (KeyError, TypeError, ValueError):
+            return _error(400, "Provide 'city' or numeric 'latitude' and 'longitude'")
+
+    try:
+        if "preset" in body:
+            if body["preset"] not in PRESETS:
+                return _error(400, f"Unknown preset, expected one of {sorted(PRESETS)}")
+            rule = alert_engine.add_preset(lat, lon, body["preset"], name=body.get("name"))
+        else:
+            rule = alert_engine.add_rule(lat, lon, body.get("variable"), body.get("operator"),
+                                         float(body.get("threshold")), name=body.get("name"))
+    except (TypeError, ValueError) as exc:
+        return _error(400, str(exc))
+
+    return _json_response(asdict(rule), status=201)
+
+
+@weather_api.route("/alerts/<rule_id>", methods=["DELETE"])
+def delete_alert(rule_id):
+    if alert_engine.remove_rule(rule_id) is None:
+        return _error(404, f"No such rule: {rule_id}")
+    return Response(status=204)
+
+
+@weather_api.route("/cache/stats")
+def cache_stats():
+    response = _json_response(weather_cache.stats())
+    response.cache_control.no_store = True
+    return response
+
+
+def create_app():
+    """Standalone Flask app serving only the weather API"""
+    app = Flask(__name__)
+    app.register_blueprint(weather_api)
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run(port=8052)
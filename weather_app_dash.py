@@ -1,44 +1,33 @@
-from dash import Dash, html, dcc, Input, Output, State
-import requests
+from dash import Dash, ctx, html, dcc, dash_table, no_update, Input, Output, State
 from datetime import datetime
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
-app = Dash(__name__)
+from weather_api import weather_api
+from weather_cards import render_day_cards
+from weather_compare import HEATMAP_VARIABLES, comparison_heatmap, compare_forecasts, parse_city_list
+from weather_core import (SINGLE_FLIGHT_WINDOW, SingleFlight, UpstreamUnavailable, get_city_forecast,
+                          get_city_forecasts, get_location, get_point_forecast, get_weather_description,
+                          get_wind_direction, stale_notice)
+from weather_export import EXPORT_SECTIONS
+from weather_figures import figure_dicts
+from weather_live import LIVE_POLL_INTERVAL, live_updater
+from weather_map import MAP_OVERLAYS, map_figure, viewport_bounds
+from weather_solar import daylight_figure, sun_summary
+from weather_units import UNIT_SYSTEMS, convert_forecast, convert_section, unit_label
 
-def get_coordinates(city):
-    geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
-    response = requests.get(geocode_url)
-    data = response.json()
-    
-    if "results" in data and data["results"]:
-        result = data["results"][0]
-        return result["latitude"], result["longitude"], result.get("country", "")
-    else:
-        return None, None, None
+# Number of rendered forecasts kept in the browser so flipping back to a
+# recently viewed city is handled client-side without a server round trip.
+RECENT_CITY_LIMIT = 5
 
-def get_weather_description(code):
-    """Convert WMO weather code to description"""
-    weather_codes = {
-        0: "☀️ Clear sky", 1: "🌤️ Mainly clear", 2: "⛅ Partly cloudy", 3: "☁️ Overcast",
-        45: "🌫️ Fog", 48: "🌫️ Depositing rime fog",
-        51: "🌦️ Light drizzle", 53: "🌦️ Moderate drizzle", 55: "🌧️ Dense drizzle",
-        56: "🌧️ Light freezing drizzle", 57: "🌧️ Dense freezing drizzle",
-        61: "🌧️ Slight rain", 63: "🌧️ Moderate rain", 65: "🌧️ Heavy rain",
-        66: "🌧️ Light freezing rain", 67: "🌧️ Heavy freezing rain",
-        71: "🌨️ Slight snow", 73: "🌨️ Moderate snow", 75: "❄️ Heavy snow", 77: "🌨️ Snow grains",
-        80: "🌦️ Slight rain showers", 81: "🌧️ Moderate rain showers", 82: "⛈️ Violent rain showers",
-        85: "🌨️ Slight snow showers", 86: "❄️ Heavy snow showers",
-        95: "⛈️ Thunderstorm", 96: "⛈️ Thunderstorm with slight hail", 99: "⛈️ Thunderstorm with heavy hail"
-    }
-    return weather_codes.get(code, "Unknown")
+# Identical fetch requests share one render while it runs and shortly after
+render_flights = SingleFlight(SINGLE_FLIGHT_WINDOW)
+
+ERROR_STYLE = {'color': 'red', 'fontSize': '18px', 'textAlign': 'center', 
+               'padding': '20px', 'backgroundColor': '#ffebee', 'borderRadius': '5px'}
 
-def get_wind_direction(degrees):
-    """Convert wind direction degrees to compass direction"""
-    directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-    index = round(degrees / 22.5) % 16
-    return directions[index]
+# Rendered views are cached in the browser, so the live callback's output
+# ('current-weather') is only in the layout while a forecast is displayed
+app = Dash(__name__, suppress_callback_exceptions=True)
+app.server.register_blueprint(weather_api)
 
 app.layout = html.Div([
     html.H1("🌤️ Comprehensive Weather App", style={'textAlign': 'center', 'marginBottom': '30px'}),
@@ -52,305 +41,248 @@ app.layout = html.Div([
             style={'padding': '10px', 'fontSize': '16px', 'width': '300px', 'marginRight': '10px'}
         ),
         html.Button('Get Weather', id='weather-button', n_clicks=0, 
-                   style={'padding': '10px 20px', 'fontSize': '16px', 'cursor': 'pointer'})
+                   style={'padding': '10px 20px', 'fontSize': '16px', 'cursor': 'pointer'}),
+        dcc.RadioItems(
+            id='units-toggle',
+            options=[{'label': units.title(), 'value': units} for units in UNIT_SYSTEMS],
+            value='metric',
+            inline=True,
+            inputStyle={'marginLeft': '15px', 'marginRight': '5px'},
+            style={'display': 'inline-block', 'fontSize': '16px'}
+        )
     ], style={'textAlign': 'center', 'marginBottom': '30px'}),
     
-    html.Div(id='weather-output', style={'padding': '20px', 'maxWidth': '1400px', 'margin': '0 auto'})
+    dcc.Store(id='forecast-store', storage_type='session', data={'order': [], 'views': {}, 'expires': {}}),
+    dcc.Store(id='fetched-view'),
+    dcc.Store(id='selected-city'),
+    dcc.Store(id='fetch-request'),
+    dcc.Interval(id='live-interval', interval=LIVE_POLL_INTERVAL * 1000),
+    dcc.Store(id='map-bounds'),
+    
+    # Map picker: a click selects coordinates directly, without geocoding
+    html.Details([
+        html.Summary("🗺️ Pick a location on the map", style={'fontSize': '18px', 'cursor': 'pointer'}),
+        dcc.RadioItems(
+            id='map-overlay',
+            options=[{'label': 'No overlay', 'value': ''}] + [
+                {'label': label, 'value': variable} for variable, (label, _, _) in MAP_OVERLAYS.items()
+            ],
+            value='',
+            inline=True,
+            inputStyle={'marginLeft': '15px', 'marginRight': '5px'},
+            style={'margin': '10px 0'}
+        ),
+        dcc.Graph(id='location-map', figure=map_figure(), config={'scrollZoom': True})
+    ], style={'maxWidth': '1400px', 'margin': '0 auto 30px', 'padding': '0 20px'}),
+    
+    html.Div(id='weather-output', style={'padding': '20px', 'maxWidth': '1400px', 'margin': '0 auto'}),
+    
+    # Multi-city comparison
+    html.Div([
+        html.Hr(style={'margin': '30px 0'}),
+        html.H3("🏙️ Compare Cities", style={'marginBottom': '20px'}),
+        dcc.Textarea(
+            id='compare-input',
+            value='Copenhagen, Oslo, Stockholm, Helsinki, Reykjavik',
+            placeholder='Enter city names separated by commas or new lines',
+            style={'padding': '10px', 'fontSize': '16px', 'width': '100%', 'height': '80px'}
+        ),
+        html.Div([
+            dcc.Dropdown(
+                id='compare-variable',
+                options=[{'label': label, 'value': variable} for variable, (label, _, _) in HEATMAP_VARIABLES.items()],
+                value='temperature_2m_max',
+                clearable=False,
+                style={'width': '300px', 'marginRight': '10px'}
+            ),
+            html.Button('Compare', id='compare-button', n_clicks=0,
+                       style={'padding': '10px 20px', 'fontSize': '16px', 'cursor': 'pointer'})
+        ], style={'display': 'flex', 'alignItems': 'center', 'marginTop': '10px', 'marginBottom': '20px'}),
+        html.Div([
+            dcc.RadioItems(
+                id='export-section',
+                options=[{'label': section.title(), 'value': section} for section in EXPORT_SECTIONS],
+                value='hourly',
+                inline=True,
+                inputStyle={'marginLeft': '10px', 'marginRight': '5px'}
+            ),
+            dcc.RadioItems(
+                id='export-format',
+                options=[{'label': 'CSV', 'value': 'csv'}, {'label': 'Parquet', 'value': 'parquet'}],
+                value='csv',
+                inline=True,
+                inputStyle={'marginLeft': '10px', 'marginRight': '5px'}
+            ),
+            html.A('⬇️ Download forecasts', id='export-link', href='', target='_blank',
+                   style={'padding': '10px 20px', 'fontSize': '16px', 'border': '1px solid #ddd',
+                          'borderRadius': '5px', 'textDecoration': 'none'})
+        ], style={'display': 'flex', 'alignItems': 'center', 'gap': '20px', 'marginBottom': '20px'}),
+        html.Div(id='compare-output')
+    ], style={'padding': '20px', 'maxWidth': '1400px', 'margin': '0 auto'})
 ], style={'fontFamily': 'Arial, sans-serif', 'padding': '20px'})
 
-@app.callback(
-    Output('weather-output', 'children'),
-    Input('weather-button', 'n_clicks'),
-    Input('city-input', 'n_submit'),
-    State('city-input', 'value')
-)
-def update_weather(n_clicks, n_submit, city):
-    if n_clicks == 0 and n_submit is None:
-        return ""
+def render_sun_times(lat, lon, timezone):
+    sun = sun_summary(lat, lon, timezone)
     
-    lat, lon, country = get_coordinates(city)
+    def sun_card(label, value, color, background):
+        return html.Div([
+            html.Strong(label),
+            html.Div(value, style={'fontSize': '32px', 'color': color, 'fontWeight': 'bold'})
+        ], style={'flex': '1', 'padding': '20px', 'border': '1px solid #ddd', 
+                 'borderRadius': '5px', 'backgroundColor': background})
     
-    if lat and lon:
-        weather_url = f"""https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,rain,weather_code,cloud_cover,pressure_msl,wind_speed_10m,wind_direction_10m,wind_gusts_10m&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,sunrise,sunset,uv_index_max&hourly=temperature_2m,precipitation_probability,wind_speed_10m&timezone=auto"""
+    return html.Div([
+        html.Hr(style={'margin': '30px 0'}),
+        html.H3("🌅 Sun Times (Today)", style={'marginBottom': '20px'}),
+        html.Div([
+            sun_card("🌅 Sunrise", sun['sunrise'], '#ff9800', '#fff8e1'),
+            sun_card("🌇 Sunset", sun['sunset'], '#e91e63', '#fce4ec'),
+            sun_card("☀️ Solar Noon", sun['solar_noon'], '#ffb300', '#fffde7'),
+            sun_card("⏳ Day Length", sun['day_length'], '#5c6bc0', '#e8eaf6')
+        ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '30px'}),
+        dcc.Graph(figure=daylight_figure(lat, lon, timezone))
+    ])
+
+def render_current_weather(current, updated_at=None, units='metric'):
+    temperature_unit, speed_unit = unit_label('temperature', units), unit_label('speed', units)
+    precipitation_unit = unit_label('precipitation', units)
+    return [
+        # 4 column grid for current weather
+        html.Div([
+            # Column 1
+            html.Div([
+                html.Div([
+                    html.Strong("Temperature"),
+                    html.Div(f"{current['temperature_2m']}{temperature_unit}", 
+                            style={'fontSize': '32px', 'color': '#1f77b4', 'fontWeight': 'bold'})
+                ], style={'marginBottom': '20px'}),
+                html.Div([
+                    html.Strong("Feels Like"),
+                    html.Div(f"{current['apparent_temperature']}{temperature_unit}", 
+                            style={'fontSize': '24px', 'color': '#666'})
+                ])
+            ], style={'flex': '1', 'padding': '10px'}),
+            
+            # Column 2
+            html.Div([
+                html.Div([
+                    html.Strong("Humidity"),
+                    html.Div(f"{current['relative_humidity_2m']}%", 
+                            style={'fontSize': '32px', 'color': '#2ca02c', 'fontWeight': 'bold'})
+                ], style={'marginBottom': '20px'}),
+                html.Div([
+                    html.Strong("Cloud Cover"),
+                    html.Div(f"{current['cloud_cover']}%", 
+                            style={'fontSize': '24px', 'color': '#666'})
+                ])
+            ], style={'flex': '1', 'padding': '10px'}),
+            
+            # Column 3
+            html.Div([
+                html.Div([
+                    html.Strong("Wind Speed"),
+                    html.Div(f"{current['wind_speed_10m']} {speed_unit}", 
+                            style={'fontSize': '32px', 'color': '#ff7f0e', 'fontWeight': 'bold'})
+                ], style={'marginBottom': '20px'}),
+                html.Div([
+                    html.Strong("Wind Direction"),
+                    html.Div(f"{get_wind_direction(current['wind_direction_10m'])} ({current['wind_direction_10m']}°)", 
+                            style={'fontSize': '24px', 'color': '#666'})
+                ])
+            ], style={'flex': '1', 'padding': '10px'}),
+            
+            # Column 4
+            html.Div([
+                html.Div([
+                    html.Strong("Wind Gusts"),
+                    html.Div(f"{current['wind_gusts_10m']} {speed_unit}", 
+                            style={'fontSize': '32px', 'color': '#d62728', 'fontWeight': 'bold'})
+                ], style={'marginBottom': '20px'}),
+                html.Div([
+                    html.Strong("Pressure"),
+                    html.Div(f"{current['pressure_msl']} {unit_label('pressure', units)}", 
+                            style={'fontSize': '24px', 'color': '#666'})
+                ])
+            ], style={'flex': '1', 'padding': '10px'})
+        ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '20px'}),
         
-        weather_response = requests.get(weather_url).json()
-        current = weather_response["current"]
-        daily = weather_response["daily"]
-        hourly = weather_response["hourly"]
+        # Weather condition
+        html.Div(
+            f"Condition: {get_weather_description(current['weather_code'])}",
+            style={'padding': '15px', 'backgroundColor': '#e3f2fd', 'borderRadius': '5px', 
+                   'fontSize': '18px', 'fontWeight': 'bold', 'marginBottom': '10px'}
+        ),
+        
+        # Precipitation warning if any
+        html.Div(
+            f"💧 Precipitation: {current['precipitation']} {precipitation_unit} | "
+            f"Rain: {current['rain']} {precipitation_unit}",
+            style={'padding': '15px', 'backgroundColor': '#fff3cd', 'borderRadius': '5px', 
+                   'fontSize': '16px', 'marginBottom': '20px'} if current['precipitation'] > 0 else {'display': 'none'}
+        ),
+        
+        # Live update timestamp
+        html.Div(
+            f"🔴 Live · updated {datetime.fromtimestamp(updated_at).strftime('%H:%M')}" if updated_at else "",
+            style={'fontSize': '12px', 'color': '#666'}
+        )
+    ]
+
+def selection_location(selection):
+    """Coordinates and timezone of a selected map point or geocoded city, or None"""
+    if 'latitude' in selection:
+        return {'latitude': selection['latitude'], 'longitude': selection['longitude'], 'timezone': None}
+    return get_location(selection['city'])
+
+def render_weather(city, forecast, units='metric'):
+    if forecast is not None:
+        forecast = convert_forecast(forecast, units)
+        lat, lon, country = forecast.latitude, forecast.longitude, forecast.country
+        current = forecast.current
+        daily = forecast.daily
         
         # Header
         header = html.Div([
-            html.H2(f"📍 {city}, {country}", style={'marginBottom': '5px'}),
-            html.P(f"Coordinates: {lat:.2f}°, {lon:.2f}°", style={'color': '#666', 'fontSize': '14px'})
+            html.H2(f"📍 {city}, {country}" if country else f"📍 {city}", style={'marginBottom': '5px'}),
+            html.P(f"Coordinates: {lat:.2f}°, {lon:.2f}°", style={'color': '#666', 'fontSize': '14px'}),
+            html.Div(stale_notice(forecast), 
+                    style={'padding': '15px', 'backgroundColor': '#fff3cd', 'borderRadius': '5px', 
+                           'fontSize': '16px'} if forecast.stale else {'display': 'none'})
         ])
         
         # VISUALIZATIONS SECTION
         visualizations_header = html.H3("📊 Weather Visualizations", style={'marginTop': '30px', 'marginBottom': '20px'})
         
-        # Prepare data for charts
-        dates = [datetime.fromisoformat(d).strftime('%a %m/%d') for d in daily['time'][:7]]
-        hourly_times = [datetime.fromisoformat(t).strftime('%H:%M') for t in hourly['time'][:24]]
+        figures = figure_dicts(forecast, units)
         
-        # Temperature Forecast Chart
-        fig_temp = go.Figure()
-        fig_temp.add_trace(go.Scatter(
-            x=dates, y=daily['temperature_2m_max'][:7],
-            mode='lines+markers',
-            name='High',
-            line=dict(color='#ff7043', width=3),
-            marker=dict(size=10)
-        ))
-        fig_temp.add_trace(go.Scatter(
-            x=dates, y=daily['temperature_2m_min'][:7],
-            mode='lines+markers',
-            name='Low',
-            line=dict(color='#42a5f5', width=3),
-            marker=dict(size=10),
-            fill='tonexty',
-            fillcolor='rgba(100, 149, 237, 0.2)'
-        ))
-        fig_temp.update_layout(
-            title='7-Day Temperature Forecast',
-            xaxis_title='Date',
-            yaxis_title='Temperature (°C)',
-            hovermode='x unified',
-            height=400
-        )
-        
-        temp_chart = dcc.Graph(figure=fig_temp, style={'marginBottom': '30px'})
-        
-        # Precipitation Probability Chart
-        fig_precip = go.Figure()
-        fig_precip.add_trace(go.Bar(
-            x=dates,
-            y=daily['precipitation_probability_max'][:7],
-            marker=dict(
-                color=daily['precipitation_probability_max'][:7],
-                colorscale='Blues',
-                showscale=True,
-                colorbar=dict(title="Probability %")
-            ),
-            text=[f"{p}%" for p in daily['precipitation_probability_max'][:7]],
-            textposition='outside'
-        ))
-        fig_precip.update_layout(
-            title='Rain Probability (7 Days)',
-            xaxis_title='Date',
-            yaxis_title='Probability (%)',
-            height=400
-        )
-        
-        # UV Index Chart
-        fig_uv = go.Figure()
-        colors = ['#4caf50' if uv <= 2 else '#ffeb3b' if uv <= 5 else '#ff9800' if uv <= 7 else '#f44336' 
-                 for uv in daily['uv_index_max'][:7]]
-        fig_uv.add_trace(go.Bar(
-            x=dates,
-            y=daily['uv_index_max'][:7],
-            marker=dict(color=colors),
-            text=daily['uv_index_max'][:7],
-            textposition='outside'
-        ))
-        fig_uv.update_layout(
-            title='UV Index (7 Days)',
-            xaxis_title='Date',
-            yaxis_title='UV Index',
-            height=400
-        )
+        temp_chart = dcc.Graph(figure=figures['temperature'], style={'marginBottom': '30px'})
         
         # Two column layout for precipitation and UV charts
         precip_uv_row = html.Div([
-            html.Div([dcc.Graph(figure=fig_precip)], style={'flex': '1', 'marginRight': '15px'}),
-            html.Div([dcc.Graph(figure=fig_uv)], style={'flex': '1'})
+            html.Div([dcc.Graph(figure=figures['precipitation'])], style={'flex': '1', 'marginRight': '15px'}),
+            html.Div([dcc.Graph(figure=figures['uv'])], style={'flex': '1'})
         ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '30px'})
         
-        # 24-Hour Hourly Forecast
-        fig_hourly = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=('Temperature (Next 24 Hours)', 'Wind Speed (Next 24 Hours)'),
-            vertical_spacing=0.15
-        )
-        
-        fig_hourly.add_trace(go.Scatter(
-            x=hourly_times,
-            y=hourly['temperature_2m'][:24],
-            mode='lines',
-            name='Temperature',
-            line=dict(color='#ff6b6b', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(255, 107, 107, 0.2)'
-        ), row=1, col=1)
-        
-        fig_hourly.add_trace(go.Scatter(
-            x=hourly_times,
-            y=hourly['wind_speed_10m'][:24],
-            mode='lines',
-            name='Wind Speed',
-            line=dict(color='#4ecdc4', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(78, 205, 196, 0.2)'
-        ), row=2, col=1)
-        
-        fig_hourly.update_xaxes(title_text="Time", row=2, col=1)
-        fig_hourly.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
-        fig_hourly.update_yaxes(title_text="Wind Speed (km/h)", row=2, col=1)
-        fig_hourly.update_layout(height=600, showlegend=False)
+        hourly_chart = dcc.Graph(figure=figures['hourly'], style={'marginBottom': '30px'})
         
-        hourly_chart = dcc.Graph(figure=fig_hourly, style={'marginBottom': '30px'})
-        
-        # Wind Rose (Polar chart for current wind)
-        fig_wind = go.Figure()
-        fig_wind.add_trace(go.Barpolar(
-            r=[current['wind_speed_10m']],
-            theta=[current['wind_direction_10m']],
-            marker=dict(color='#00bcd4', line=dict(color='#006064', width=2)),
-            width=[20],
-            name='Wind'
-        ))
-        fig_wind.update_layout(
-            title='Current Wind Direction & Speed',
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, max(current['wind_speed_10m'] * 1.5, 20)]),
-                angularaxis=dict(direction='clockwise', rotation=90)
-            ),
-            height=400
-        )
-        
-        wind_chart = dcc.Graph(figure=fig_wind, style={'marginBottom': '30px'})
+        wind_chart = dcc.Graph(figure=figures['wind'], style={'marginBottom': '30px'})
         
         # Current Weather Section
         current_weather = html.Div([
             html.Hr(style={'margin': '30px 0'}),
             html.H3("🌡️ Current Weather", style={'marginTop': '30px', 'marginBottom': '20px'}),
-            
-            # 4 column grid for current weather
-            html.Div([
-                # Column 1
-                html.Div([
-                    html.Div([
-                        html.Strong("Temperature"),
-                        html.Div(f"{current['temperature_2m']}°C", 
-                                style={'fontSize': '32px', 'color': '#1f77b4', 'fontWeight': 'bold'})
-                    ], style={'marginBottom': '20px'}),
-                    html.Div([
-                        html.Strong("Feels Like"),
-                        html.Div(f"{current['apparent_temperature']}°C", 
-                                style={'fontSize': '24px', 'color': '#666'})
-                    ])
-                ], style={'flex': '1', 'padding': '10px'}),
-                
-                # Column 2
-                html.Div([
-                    html.Div([
-                        html.Strong("Humidity"),
-                        html.Div(f"{current['relative_humidity_2m']}%", 
-                                style={'fontSize': '32px', 'color': '#2ca02c', 'fontWeight': 'bold'})
-                    ], style={'marginBottom': '20px'}),
-                    html.Div([
-                        html.Strong("Cloud Cover"),
-                        html.Div(f"{current['cloud_cover']}%", 
-                                style={'fontSize': '24px', 'color': '#666'})
-                    ])
-                ], style={'flex': '1', 'padding': '10px'}),
-                
-                # Column 3
-                html.Div([
-                    html.Div([
-                        html.Strong("Wind Speed"),
-                        html.Div(f"{current['wind_speed_10m']} km/h", 
-                                style={'fontSize': '32px', 'color': '#ff7f0e', 'fontWeight': 'bold'})
-                    ], style={'marginBottom': '20px'}),
-                    html.Div([
-                        html.Strong("Wind Direction"),
-                        html.Div(f"{get_wind_direction(current['wind_direction_10m'])} ({current['wind_direction_10m']}°)", 
-                                style={'fontSize': '24px', 'color': '#666'})
-                    ])
-                ], style={'flex': '1', 'padding': '10px'}),
-                
-                # Column 4
-                html.Div([
-                    html.Div([
-                        html.Strong("Wind Gusts"),
-                        html.Div(f"{current['wind_gusts_10m']} km/h", 
-                                style={'fontSize': '32px', 'color': '#d62728', 'fontWeight': 'bold'})
-                    ], style={'marginBottom': '20px'}),
-                    html.Div([
-                        html.Strong("Pressure"),
-                        html.Div(f"{current['pressure_msl']} hPa", 
-                                style={'fontSize': '24px', 'color': '#666'})
-                    ])
-                ], style={'flex': '1', 'padding': '10px'})
-            ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '20px'}),
-            
-            # Weather condition
-            html.Div(
-                f"Condition: {get_weather_description(current['weather_code'])}",
-                style={'padding': '15px', 'backgroundColor': '#e3f2fd', 'borderRadius': '5px', 
-                       'fontSize': '18px', 'fontWeight': 'bold', 'marginBottom': '10px'}
-            ),
-            
-            # Precipitation warning if any
-            html.Div(
-                f"💧 Precipitation: {current['precipitation']} mm | Rain: {current['rain']} mm",
-                style={'padding': '15px', 'backgroundColor': '#fff3cd', 'borderRadius': '5px', 
-                       'fontSize': '16px', 'marginBottom': '20px'} if current['precipitation'] > 0 else {'display': 'none'}
-            )
+            html.Div(render_current_weather(current, units=units), id='current-weather')
         ])
         
-        # 7-Day Forecast
-        forecast_days = []
-        for i in range(7):
-            date = datetime.fromisoformat(daily['time'][i])
-            day_card = html.Div([
-                html.Strong(date.strftime('%a %m/%d'), style={'fontSize': '16px', 'marginBottom': '10px', 'display': 'block'}),
-                html.Div([
-                    html.Div("High", style={'fontSize': '12px', 'color': '#666'}),
-                    html.Div(f"{daily['temperature_2m_max'][i]}°C", 
-                            style={'fontSize': '24px', 'color': '#d62728', 'fontWeight': 'bold'})
-                ], style={'marginBottom': '10px'}),
-                html.Div([
-                    html.Div("Low", style={'fontSize': '12px', 'color': '#666'}),
-                    html.Div(f"{daily['temperature_2m_min'][i]}°C", 
-                            style={'fontSize': '24px', 'color': '#1f77b4', 'fontWeight': 'bold'})
-                ], style={'marginBottom': '10px'}),
-                html.Div(f"💧 {daily['precipitation_probability_max'][i]}%" if daily['precipitation_probability_max'][i] else "", 
-                        style={'fontSize': '12px', 'marginBottom': '5px'}),
-                html.Div(f"🌧️ {daily['precipitation_sum'][i]} mm" if daily['precipitation_sum'][i] > 0 else "", 
-                        style={'fontSize': '12px', 'marginBottom': '5px'}),
-                html.Div(f"☀️ UV: {daily['uv_index_max'][i]}", 
-                        style={'fontSize': '12px', 'color': '#666'})
-            ], style={'flex': '1', 'padding': '15px', 'border': '1px solid #ddd', 
-                     'borderRadius': '5px', 'backgroundColor': '#f9f9f9', 'minWidth': '120px'})
-            forecast_days.append(day_card)
-        
+        # Day cards, rendered in one pass as a single HTML block
         forecast_section = html.Div([
             html.Hr(style={'margin': '30px 0'}),
-            html.H3("📅 7-Day Forecast", style={'marginBottom': '20px'}),
-            html.Div(forecast_days, style={'display': 'flex', 'gap': '15px', 'overflowX': 'auto'})
+            html.H3(f"📅 {len(daily['time'])}-Day Forecast", style={'marginBottom': '20px'}),
+            dcc.Markdown(render_day_cards(daily, units=units), dangerously_allow_html=True)
         ])
         
-        # Sun Times
-        sunrise = datetime.fromisoformat(daily['sunrise'][0])
-        sunset = datetime.fromisoformat(daily['sunset'][0])
-        
-        sun_times = html.Div([
-            html.Hr(style={'margin': '30px 0'}),
-            html.H3("🌅 Sun Times (Today)", style={'marginBottom': '20px'}),
-            html.Div([
-                html.Div([
-                    html.Strong("🌅 Sunrise"),
-                    html.Div(sunrise.strftime('%H:%M'), 
-                            style={'fontSize': '32px', 'color': '#ff9800', 'fontWeight': 'bold'})
-                ], style={'flex': '1', 'padding': '20px', 'border': '1px solid #ddd', 
-                         'borderRadius': '5px', 'backgroundColor': '#fff8e1'}),
-                html.Div([
-                    html.Strong("🌇 Sunset"),
-                    html.Div(sunset.strftime('%H:%M'), 
-                            style={'fontSize': '32px', 'color': '#e91e63', 'fontWeight': 'bold'})
-                ], style={'flex': '1', 'padding': '20px', 'border': '1px solid #ddd', 
-                         'borderRadius': '5px', 'backgroundColor': '#fce4ec'})
-            ], style={'display': 'flex', 'gap': '20px'})
-        ])
+        # Sun Times, computed locally
+        sun_times = render_sun_times(lat, lon, forecast.timezone)
         
         return html.Div([
             header, 
@@ -364,9 +296,241 @@ def update_weather(n_clicks, n_submit, city):
             sun_times
         ])
     else:
-        return html.Div("❌ City not found. Please check the spelling.", 
-                       style={'color': 'red', 'fontSize': '18px', 'textAlign': 'center', 
-                              'padding': '20px', 'backgroundColor': '#ffebee', 'borderRadius': '5px'})
+        return html.Div("❌ City not found. Please check the spelling.", style=ERROR_STYLE)
+
+# Select a city or a map point in the browser; only ask the server when it is
+# not in the store yet or its forecast has expired. Views are stored per
+# location and unit system, and switching units re-renders the selection from
+# the server-side forecast cache.
+app.clientside_callback(
+    """
+    function(n_clicks, n_submit, units, click, city, selected, pending, store) {
+        const no_update = window.dash_clientside.no_update;
+        const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+        let next;
+        if (triggered.includes('location-map.clickData')) {
+            const point = click.points[0];
+            next = {
+                city: point.lat.toFixed(2) + '°, ' + point.lon.toFixed(2) + '°',
+                latitude: point.lat,
+                longitude: point.lon,
+                units: units,
+                key: '@' + point.lat.toFixed(4) + ',' + point.lon.toFixed(4) + '|' + units
+            };
+        } else if (triggered.includes('units-toggle.value')) {
+            if (!selected) {
+                return [no_update, no_update];
+            }
+            next = {...selected, units: units, key: selected.key.replace(/[|][^|]*$/, '|' + units)};
+        } else {
+            const name = (city || '').trim().toLowerCase();
+            if (!name) {
+                return [no_update, no_update];
+            }
+            next = {city: city, units: units, key: name + '|' + units};
+        }
+        if (store && store.views && store.views[next.key] && (store.expires || {})[next.key] > Date.now()) {
+            return [next, no_update];
+        }
+        // Debounce double submits: the same request was sent moments ago
+        if (pending && pending.key === next.key && Date.now() - pending.ts < SINGLE_FLIGHT_WINDOW_MS) {
+            return [next, no_update];
+        }
+        return [next, {...next, ts: Date.now()}];
+    }
+    """.replace('SINGLE_FLIGHT_WINDOW_MS', str(SINGLE_FLIGHT_WINDOW * 1000)),
+    Output('selected-city', 'data'),
+    Output('fetch-request', 'data'),
+    Input('weather-button', 'n_clicks'),
+    Input('city-input', 'n_submit'),
+    Input('units-toggle', 'value'),
+    Input('location-map', 'clickData'),
+    State('city-input', 'value'),
+    State('selected-city', 'data'),
+    State('fetch-request', 'data'),
+    State('forecast-store', 'data'),
+    prevent_initial_call=True
+)
+
+# Redisplay the selected city straight from the store
+app.clientside_callback(
+    """
+    function(selected, store) {
+        if (!selected || !store || !store.views || !store.views[selected.key]) {
+            return window.dash_clientside.no_update;
+        }
+        return store.views[selected.key];
+    }
+    """,
+    Output('weather-output', 'children'),
+    Input('selected-city', 'data'),
+    Input('forecast-store', 'data')
+)
+
+def build_view(fetch_request):
+    """(forecast or None, rendered view) for a fetch request"""
+    try:
+        if 'latitude' in fetch_request:
+            forecast = get_point_forecast(fetch_request['latitude'], fetch_request['longitude'])
+        else:
+            forecast = get_city_forecast(fetch_request['city'])
+        return forecast, render_weather(fetch_request['city'], forecast, fetch_request['units'])
+    except UpstreamUnavailable:
+        view = html.Div("❌ Weather service is temporarily unavailable. Please try again shortly.", style=ERROR_STYLE)
+        # Sun times need no network, so show them whenever the location is known
+        try:
+            location = selection_location(fetch_request)
+        except UpstreamUnavailable:
+            location = None
+        if location is not None:
+            view = html.Div([view, render_sun_times(location['latitude'], location['longitude'], location['timezone'])])
+        return None, view
+
+@app.callback(
+    Output('fetched-view', 'data'),
+    Input('fetch-request', 'data'),
+    running=[(Output('weather-button', 'disabled'), True, False)],
+    prevent_initial_call=True
+)
+def update_weather(fetch_request):
+    key = fetch_request['key']
+    
+    # Duplicate submits from any session join the render already in flight
+    forecast, view = render_flights.do(key, lambda: build_view(fetch_request))
+    
+    # Errors and stale data are shown once but refetched on the next lookup
+    max_age = forecast.max_age if forecast is not None and not forecast.stale else 0
+    return {'key': key, 'view': view, 'max_age': max_age}
+
+# Add the fetched view to the store in the browser, so the store itself never
+# travels to the server. Views expire with the forecast they were rendered from.
+app.clientside_callback(
+    """
+    function(fetched, store) {
+        if (!fetched) {
+            return window.dash_clientside.no_update;
+        }
+        store = store || {};
+        const key = fetched.key;
+        const order = (store.order || []).filter(k => k !== key).concat([key]).slice(-RECENT_CITY_LIMIT);
+        const views = {}, expires = {};
+        order.forEach(k => {
+            if (k === key) {
+                views[k] = fetched.view;
+                expires[k] = Date.now() + fetched.max_age * 1000;
+            } else if (store.views && store.views[k]) {
+                views[k] = store.views[k];
+                expires[k] = (store.expires || {})[k] || 0;
+            }
+        });
+        return {order: order, views: views, expires: expires};
+    }
+    """.replace('RECENT_CITY_LIMIT', str(RECENT_CITY_LIMIT)),
+    Output('forecast-store', 'data'),
+    Input('fetched-view', 'data'),
+    State('forecast-store', 'data'),
+    prevent_initial_call=True
+)
+
+@app.callback(
+    Output('current-weather', 'children'),
+    Input('live-interval', 'n_intervals'),
+    State('selected-city', 'data'),
+    prevent_initial_call=True
+)
+def update_live_weather(n_intervals, selected):
+    # Reads the updater's shared result; only the updater itself calls upstream
+    try:
+        location = selection_location(selected) if selected else None
+    except UpstreamUnavailable:
+        location = None
+    if location is None:
+        return no_update
+    latest = live_updater.current(live_updater.watch(location['latitude'], location['longitude']))
+    if latest is None:
+        return no_update
+    current, updated_at = latest
+    units = selected['units']
+    return render_current_weather(convert_section(current, units), updated_at, units)
+
+@app.callback(
+    Output('map-bounds', 'data'),
+    Input('location-map', 'relayoutData'),
+    prevent_initial_call=True
+)
+def update_map_bounds(relayout):
+    bounds = viewport_bounds(relayout)
+    return no_update if bounds is None else bounds
+
+@app.callback(
+    Output('location-map', 'figure'),
+    Input('map-bounds', 'data'),
+    Input('map-overlay', 'value'),
+    Input('units-toggle', 'value'),
+    Input('selected-city', 'data'),
+    prevent_initial_call=True
+)
+def update_map(bounds, overlay, units, selected):
+    # The overlay grid is one batched, cached request for the visible region
+    point = (selected['latitude'], selected['longitude']) if selected and 'latitude' in selected else None
+    try:
+        return map_figure(bounds, overlay or None, units, selected=point)
+    except UpstreamUnavailable:
+        return map_figure(bounds, None, units, selected=point)
+
+# Point the download link at the streaming export endpoint for the listed cities
+app.clientside_callback(
+    """
+    function(text, section, fmt, units) {
+        const params = new URLSearchParams({section: section, format: fmt, units: units});
+        (text || '').split(/[,;\\n]/).map(c => c.trim()).filter(c => c).forEach(c => params.append('city', c));
+        return '/weather/export?' + params.toString();
+    }
+    """,
+    Output('export-link', 'href'),
+    Input('compare-input', 'value'),
+    Input('export-section', 'value'),
+    Input('export-format', 'value'),
+    Input('units-toggle', 'value')
+)
+
+@app.callback(
+    Output('compare-output', 'children'),
+    Input('compare-button', 'n_clicks'),
+    Input('compare-variable', 'value'),
+    Input('units-toggle', 'value'),
+    State('compare-input', 'value'),
+    prevent_initial_call=True
+)
+def update_comparison(n_clicks, variable, units, text):
+    # Switching units re-renders a comparison already on display, but never starts one
+    if not n_clicks and ctx.triggered_id == 'units-toggle':
+        return no_update
+    cities = parse_city_list(text)
+    try:
+        forecasts = get_city_forecasts(cities)
+    except UpstreamUnavailable:
+        return html.Div("❌ Weather service is temporarily unavailable. Please try again shortly.", style=ERROR_STYLE)
+    found = [convert_forecast(f, units) for f in forecasts if f is not None]
+    missing = [city for city, f in zip(cities, forecasts) if f is None]
+    
+    if not found:
+        return html.Div("❌ None of the cities were found. Please check the spelling.", style=ERROR_STYLE)
+    
+    table = compare_forecasts(found, units=units)
+    
+    return html.Div([
+        dcc.Graph(figure=comparison_heatmap(found, variable, units=units), style={'marginBottom': '30px'}),
+        dash_table.DataTable(
+            data=table.to_dict('records'),
+            columns=[{'name': c, 'id': c} for c in table.columns],
+            sort_action='native',
+            style_table={'overflowX': 'auto'},
+            style_cell={'padding': '8px', 'fontFamily': 'Arial, sans-serif'},
+            style_header={'fontWeight': 'bold', 'backgroundColor': '#f9f9f9'}
+        ),
+        html.P(f"Not found: {', '.join(missing)}", style={'color': '#666', 'marginTop': '10px'}) if missing else None
+    ])
 
 if __name__ == '__main__':
     app.run(debug=True, port=8051)
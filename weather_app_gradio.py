@@ -1,230 +1,228 @@
-import gradio as gr
-import requests
-from datetime import datetime
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-
+import atexit
+import os
+import shutil
+import tempfile
+import time
 
-def get_coordinates(city):
-    geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
-    response = requests.get(geocode_url)
-    data = response.json()
+import gradio as gr
+from gradio.components.plot import PlotData
+import orjson
 
-    if "results" in data and data["results"]:
-        result = data["results"][0]
-        return result["latitude"], result["longitude"], result.get("country", "")
-    else:
-        return None, None, None
+from weather_cards import render_day_cards
+from weather_compare import HEATMAP_VARIABLES, comparison_heatmap, compare_forecasts, parse_city_list
+from weather_core import (FORECAST_DAYS, SINGLE_FLIGHT_WINDOW, SingleFlight, UpstreamUnavailable, get_city_forecast,
+                          get_city_forecasts, get_location, get_point_forecast, get_weather_description,
+                          get_wind_direction, stale_notice)
+from weather_export import EXPORT_SECTIONS, export_filename, export_forecasts
+from weather_figures import figure_dicts
+from weather_live import LIVE_POLL_INTERVAL, live_updater
+from weather_map import MAP_OVERLAYS, area_bounds, map_figure
+from weather_solar import daylight_figure, sun_summary
+from weather_units import UNIT_SYSTEMS, convert_forecast, convert_section, unit_label
 
+# Identical requests share one render while it runs and shortly after
+_weather_flights = SingleFlight(SINGLE_FLIGHT_WINDOW)
 
-def get_weather_description(code):
-    weather_codes = {
-        0: "☀️ Clear sky", 1: "🌤️ Mainly clear", 2: "⛅ Partly cloudy", 3: "☁️ Overcast",
-        45: "🌫️ Fog", 48: "🌫️ Depositing rime fog",
-        51: "🌦️ Light drizzle", 53: "🌦️ Moderate drizzle", 55: "🌧️ Dense drizzle",
-        56: "🌧️ Light freezing drizzle", 57: "🌧️ Dense freezing drizzle",
-        61: "🌧️ Slight rain", 63: "🌧️ Moderate rain", 65: "🌧️ Heavy rain",
-        66: "🌧️ Light freezing rain", 67: "🌧️ Heavy freezing rain",
-        71: "🌨️ Slight snow", 73: "🌨️ Moderate snow", 75: "❄️ Heavy snow", 77: "🌨️ Snow grains",
-        80: "🌦️ Slight rain showers", 81: "🌧️ Moderate rain showers", 82: "⛈️ Violent rain showers",
-        85: "🌨️ Slight snow showers", 86: "❄️ Heavy snow showers",
-        95: "⛈️ Thunderstorm", 96: "⛈️ Thunderstorm with slight hail", 99: "⛈️ Thunderstorm with heavy hail"
-    }
-    return weather_codes.get(code, "Unknown")
+# Exports are written under one directory for the app's lifetime. Exports
+# older than EXPORT_MAX_AGE seconds are removed on the next export (Gradio's
+# own copies by delete_cache), and the directory itself at exit.
+EXPORT_DIR = tempfile.mkdtemp(prefix='weather-export-')
+EXPORT_MAX_AGE = 60 * 60
+atexit.register(shutil.rmtree, EXPORT_DIR, ignore_errors=True)
 
 
-def get_wind_direction(degrees):
-    directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-    index = round(degrees / 22.5) % 16
-    return directions[index]
+def plot_data(figure):
+    """Hand a plotly figure dict to gr.Plot without rebuilding a Figure object"""
+    return PlotData(type='plotly', plot=orjson.dumps(figure).decode())
 
 
-def get_weather(city):
-    lat, lon, country = get_coordinates(city)
-    
-    if not lat or not lon:
-        error_msg = "❌ City not found. Please check the spelling."
-        return (error_msg, None, None, None, None, None, None, 
-                "", "", "", "", "", "", "", "", "", 
-                *[""] * 7, "", "")
-    
-    weather_url = f"""https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,rain,weather_code,cloud_cover,pressure_msl,wind_speed_10m,wind_direction_10m,wind_gusts_10m&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,sunrise,sunset,uv_index_max&hourly=temperature_2m,precipitation_probability,wind_speed_10m&timezone=auto"""
-    
-    weather_response = requests.get(weather_url).json()
-    current = weather_response["current"]
-    daily = weather_response["daily"]
-    hourly = weather_response["hourly"]
-    
-    location_header = f"# 📍 {city}, {country}\n\nCoordinates: {lat:.2f}°, {lon:.2f}°"
-    
-    # Create visualizations
-    dates = [datetime.fromisoformat(d).strftime('%a %m/%d') for d in daily['time'][:7]]
-    
-    # Temperature Forecast Chart
-    fig_temp = go.Figure()
-    fig_temp.add_trace(go.Scatter(
-        x=dates, y=daily['temperature_2m_max'][:7],
-        mode='lines+markers',
-        name='High',
-        line=dict(color='#ff7043', width=3),
-        marker=dict(size=10)
-    ))
-    fig_temp.add_trace(go.Scatter(
-        x=dates, y=daily['temperature_2m_min'][:7],
-        mode='lines+markers',
-        name='Low',
-        line=dict(color='#42a5f5', width=3),
-        marker=dict(size=10),
-        fill='tonexty',
-        fillcolor='rgba(100, 149, 237, 0.2)'
-    ))
-    fig_temp.update_layout(
-        title='7-Day Temperature Forecast',
-        xaxis_title='Date',
-        yaxis_title='Temperature (°C)',
-        hovermode='x unified',
-        height=400
-    )
-    
-    # Precipitation Probability Chart
-    fig_precip = go.Figure()
-    fig_precip.add_trace(go.Bar(
-        x=dates,
-        y=daily['precipitation_probability_max'][:7],
-        marker=dict(
-            color=daily['precipitation_probability_max'][:7],
-            colorscale='Blues',
-            showscale=True,
-            colorbar=dict(title="Probability %")
-        ),
-        text=[f"{p}%" for p in daily['precipitation_probability_max'][:7]],
-        textposition='outside'
-    ))
-    fig_precip.update_layout(
-        title='Rain Probability (7 Days)',
-        xaxis_title='Date',
-        yaxis_title='Probability (%)',
-        height=400
-    )
-    
-    # UV Index Chart
-    fig_uv = go.Figure()
-    colors = ['#4caf50' if uv <= 2 else '#ffeb3b' if uv <= 5 else '#ff9800' if uv <= 7 else '#f44336' 
-             for uv in daily['uv_index_max'][:7]]
-    fig_uv.add_trace(go.Bar(
-        x=dates,
-        y=daily['uv_index_max'][:7],
-        marker=dict(color=colors),
-        text=daily['uv_index_max'][:7],
-        textposition='outside'
-    ))
-    fig_uv.update_layout(
-        title='UV Index (7 Days)',
-        xaxis_title='Date',
-        yaxis_title='UV Index',
-        height=400
-    )
-    
-    # 24-Hour Hourly Forecast
-    hourly_times = [datetime.fromisoformat(t).strftime('%H:%M') for t in hourly['time'][:24]]
-    
-    fig_hourly = make_subplots(
-        rows=2, cols=1,
-        subplot_titles=('Temperature (Next 24 Hours)', 'Wind Speed (Next 24 Hours)'),
-        vertical_spacing=0.15
-    )
-    
-    fig_hourly.add_trace(go.Scatter(
-        x=hourly_times,
-        y=hourly['temperature_2m'][:24],
-        mode='lines',
-        name='Temperature',
-        line=dict(color='#ff6b6b', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(255, 107, 107, 0.2)'
-    ), row=1, col=1)
-    
-    fig_hourly.add_trace(go.Scatter(
-        x=hourly_times,
-        y=hourly['wind_speed_10m'][:24],
-        mode='lines',
-        name='Wind Speed',
-        line=dict(color='#4ecdc4', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(78, 205, 196, 0.2)'
-    ), row=2, col=1)
-    
-    fig_hourly.update_xaxes(title_text="Time", row=2, col=1)
-    fig_hourly.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
-    fig_hourly.update_yaxes(title_text="Wind Speed (km/h)", row=2, col=1)
-    fig_hourly.update_layout(height=600, showlegend=False)
-    
-    # Wind Rose
-    fig_wind = go.Figure()
-    fig_wind.add_trace(go.Barpolar(
-        r=[current['wind_speed_10m']],
-        theta=[current['wind_direction_10m']],
-        marker=dict(color='#00bcd4', line=dict(color='#006064', width=2)),
-        width=[20],
-        name='Wind'
-    ))
-    fig_wind.update_layout(
-        title='Current Wind Direction & Speed',
-        polar=dict(
-            radialaxis=dict(visible=True, range=[0, max(current['wind_speed_10m'] * 1.5, 20)]),
-            angularaxis=dict(direction='clockwise', rotation=90)
-        ),
-        height=400
-    )
-    
-    # Current weather data
-    temp = f"{current['temperature_2m']}°C"
-    feels_like = f"{current['apparent_temperature']}°C"
+def format_current_weather(current, units='metric'):
+    temperature_unit, speed_unit = unit_label('temperature', units), unit_label('speed', units)
+    precipitation_unit = unit_label('precipitation', units)
+    temp = f"{current['temperature_2m']}{temperature_unit}"
+    feels_like = f"{current['apparent_temperature']}{temperature_unit}"
     humidity = f"{current['relative_humidity_2m']}%"
     cloud_cover = f"{current['cloud_cover']}%"
     
     wind_dir = get_wind_direction(current['wind_direction_10m'])
-    wind_speed = f"{current['wind_speed_10m']} km/h"
+    wind_speed = f"{current['wind_speed_10m']} {speed_unit}"
     wind_direction = f"{wind_dir} ({current['wind_direction_10m']}°)"
-    wind_gusts = f"{current['wind_gusts_10m']} km/h"
-    pressure = f"{current['pressure_msl']} hPa"
+    wind_gusts = f"{current['wind_gusts_10m']} {speed_unit}"
+    pressure = f"{current['pressure_msl']} {unit_label('pressure', units)}"
     
     condition = f"**Condition:** {get_weather_description(current['weather_code'])}"
     
     precipitation_info = ""
     if current['precipitation'] > 0:
-        precipitation_info = f"💧 **Precipitation:** {current['precipitation']} mm | **Rain:** {current['rain']} mm"
-    
-    # 7-day forecast
-    forecast_days = []
-    for i in range(7):
-        date = datetime.fromisoformat(daily['time'][i])
-        day_text = f"**{date.strftime('%a %m/%d')}**\n\n"
-        day_text += f"High: **{daily['temperature_2m_max'][i]}°C**\n\n"
-        day_text += f"Low: **{daily['temperature_2m_min'][i]}°C**\n\n"
-        
-        if daily['precipitation_probability_max'][i]:
-            day_text += f"💧 {daily['precipitation_probability_max'][i]}%\n\n"
-        if daily['precipitation_sum'][i] > 0:
-            day_text += f"🌧️ {daily['precipitation_sum'][i]} mm\n\n"
-        
-        day_text += f"☀️ UV: {daily['uv_index_max'][i]}"
-        forecast_days.append(day_text)
-    
-    sunrise = datetime.fromisoformat(daily['sunrise'][0])
-    sunset = datetime.fromisoformat(daily['sunset'][0])
-    sunrise_time = sunrise.strftime('%H:%M')
-    sunset_time = sunset.strftime('%H:%M')
+        precipitation_info = f"💧 **Precipitation:** {current['precipitation']} {precipitation_unit} | **Rain:** {current['rain']} {precipitation_unit}"
     
-    return (location_header, fig_temp, fig_precip, fig_uv, fig_hourly, fig_wind, None,
-            temp, feels_like, humidity, cloud_cover, 
+    return (temp, feels_like, humidity, cloud_cover, 
             wind_speed, wind_direction, wind_gusts, pressure, condition, 
-            precipitation_info, *forecast_days, sunrise_time, sunset_time)
+            precipitation_info)
+
+
+def selection_location(selection):
+    """Coordinates and timezone of a picked point ([lat, lon]) or a geocoded city name, or None"""
+    if isinstance(selection, (list, tuple)):
+        return {'latitude': selection[0], 'longitude': selection[1], 'timezone': None}
+    return get_location(selection)
+
+
+def get_live_weather(selection, units):
+    """Current conditions from the live updater's shared result; never calls upstream itself"""
+    try:
+        location = selection_location(selection) if selection else None
+    except UpstreamUnavailable:
+        location = None
+    latest = None
+    if location is not None:
+        latest = live_updater.current(live_updater.watch(location['latitude'], location['longitude']))
+    if latest is None:
+        return (gr.update(),) * 10
+    return format_current_weather(convert_section(latest[0], units), units)
+
+
+def get_sun_times(lat, lon, timezone):
+    sun = sun_summary(lat, lon, timezone)
+    return (sun['sunrise'], sun['sunset'], sun['solar_noon'], sun['day_length'],
+            daylight_figure(lat, lon, timezone))
+
+
+def get_weather(selection, units='metric'):
+    """Outputs for a city name or a picked [lat, lon] point
+
+    Duplicate requests from any session join the render already in flight.
+    """
+    place = tuple(selection) if isinstance(selection, (list, tuple)) else (selection or '').strip().lower()
+    return _weather_flights.do((place, units), lambda: render_weather(selection, units))
+
+
+def render_weather(selection, units):
+    sun_times = ("", "", "", "", None)
+    try:
+        if isinstance(selection, (list, tuple)):
+            forecast = get_point_forecast(*selection)
+        else:
+            forecast = get_city_forecast(selection)
+    except UpstreamUnavailable:
+        forecast = None
+        error_msg = "❌ Weather service is temporarily unavailable. Please try again shortly."
+        # Sun times need no network, so show them whenever the location is known
+        try:
+            location = selection_location(selection)
+        except UpstreamUnavailable:
+            location = None
+        if location is not None:
+            sun_times = get_sun_times(location['latitude'], location['longitude'], location['timezone'])
+    else:
+        error_msg = "❌ City not found. Please check the spelling."
+    
+    if forecast is None:
+        return (error_msg, None, None, None, None, None, None, 
+                "", "", "", "", "", "", "", "", "", "", 
+                "", *sun_times, None)
+    
+    forecast = convert_forecast(forecast, units)
+    lat, lon, country = forecast.latitude, forecast.longitude, forecast.country
+    current = forecast.current
+    daily = forecast.daily
+    
+    place = f"{forecast.city}, {country}" if country else forecast.city
+    location_header = f"# 📍 {place}\n\nCoordinates: {lat:.2f}°, {lon:.2f}°"
+    if forecast.stale:
+        location_header += f"\n\n**{stale_notice(forecast)}**"
+    
+    figures = {name: plot_data(fig) for name, fig in figure_dicts(forecast, units).items()}
+    
+    current_weather = format_current_weather(current, units)
+    
+    forecast_cards = render_day_cards(daily, units=units)
+    
+    sun_times = get_sun_times(lat, lon, forecast.timezone)
+    
+    return (location_header, figures['temperature'], figures['precipitation'], figures['uv'], figures['hourly'],
+            figures['wind'], None,
+            *current_weather, forecast_cards, *sun_times, selection)
+
+
+def switch_units(selection, units):
+    """Re-render the displayed location in other units from the cached forecast"""
+    if not selection:
+        return (gr.update(),) * 24
+    return get_weather(selection, units)
+
+
+def get_point_weather(lat, lon, units):
+    """Forecast for typed coordinates, skipping geocoding"""
+    if lat is None or lon is None:
+        raise gr.Error("Enter a latitude and longitude.")
+    return get_weather([lat, lon], units)
 
 
-with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {background-color: #ec4899 !important;}") as demo:
+def area_map(lat, lon, overlay, units):
+    """Map of the region around the coordinates, with the overlay fetched as one batched request"""
+    if lat is None or lon is None:
+        raise gr.Error("Enter a latitude and longitude.")
+    try:
+        return map_figure(area_bounds(lat, lon), overlay or None, units, center=(lat, lon), zoom=5,
+                          selected=(lat, lon))
+    except UpstreamUnavailable:
+        raise gr.Error("Weather service is temporarily unavailable. Please try again shortly.")
+
+
+def compare_cities(text, variable, units='metric'):
+    cities = parse_city_list(text)
+    try:
+        forecasts = get_city_forecasts(cities)
+    except UpstreamUnavailable:
+        return "❌ Weather service is temporarily unavailable. Please try again shortly.", None, None, text
+    found = [convert_forecast(f, units) for f in forecasts if f is not None]
+    missing = [city for city, f in zip(cities, forecasts) if f is None]
+    
+    if not found:
+        return "❌ None of the cities were found. Please check the spelling.", None, None, text
+    
+    status = f"Not found: {', '.join(missing)}" if missing else ""
+    return (status, comparison_heatmap(found, variable, units=units), compare_forecasts(found, units=units),
+            text)
+
+
+def switch_comparison_units(compared, variable, units):
+    """Re-render the comparison on display in other units from the cached forecasts"""
+    if not compared:
+        return (gr.update(),) * 4
+    return compare_cities(compared, variable, units)
+
+
+def _prune_exports():
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def export_cities(text, section, fmt, units):
+    """Stream the export for the listed cities into a file for download"""
+    cities = parse_city_list(text)
+    if not cities:
+        raise gr.Error("Enter at least one city to export.")
+    _prune_exports()
+    # One directory per export keeps the download's file name readable
+    export_dir = tempfile.mkdtemp(dir=EXPORT_DIR)
+    path = os.path.join(export_dir, export_filename(section, fmt))
+    try:
+        with open(path, 'wb') as f:
+            for chunk in export_forecasts(cities, section, units, fmt):
+                f.write(chunk)
+    except UpstreamUnavailable:
+        # Never hand out a partly written export
+        shutil.rmtree(export_dir, ignore_errors=True)
+        raise gr.Error("Weather service is temporarily unavailable. Please try again shortly.")
+    return path
+
+
+with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {background-color: #ec4899 !important;}",
+               delete_cache=(EXPORT_MAX_AGE, EXPORT_MAX_AGE)) as demo:
     
     gr.Markdown("# 🌤️ Comprehensive Weather App")
     
@@ -234,9 +232,29 @@ with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {bac
             value="Copenhagen",
             placeholder="Enter city name"
         )
+        units_input = gr.Radio(
+            choices=[(units.title(), units) for units in UNIT_SYSTEMS],
+            value="metric",
+            label="Units"
+        )
     
     submit_btn = gr.Button("Get Weather", variant="primary", elem_classes="primary-btn")
     
+    # Coordinates skip geocoding; Gradio plots report no clicks, so they are typed in
+    with gr.Accordion("🗺️ Pick a location by coordinates", open=False):
+        with gr.Row():
+            lat_input = gr.Number(label="Latitude", value=55.68, minimum=-90, maximum=90)
+            lon_input = gr.Number(label="Longitude", value=12.57, minimum=-180, maximum=180)
+            overlay_input = gr.Radio(
+                choices=[("No overlay", "")] + [(label, variable) for variable, (label, _, _) in MAP_OVERLAYS.items()],
+                value="",
+                label="Overlay"
+            )
+        with gr.Row():
+            point_btn = gr.Button("Get Weather Here", variant="primary", elem_classes="primary-btn")
+            area_btn = gr.Button("Show Area")
+        area_chart = gr.Plot()
+    
     location_output = gr.Markdown()
     
     gr.Markdown("## 📊 Weather Visualizations")
@@ -276,16 +294,9 @@ with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {bac
     
     gr.Markdown("---")
     
-    gr.Markdown("## 📅 7-Day Forecast")
+    gr.Markdown(f"## 📅 {FORECAST_DAYS}-Day Forecast")
     
-    with gr.Row():
-        day1_output = gr.Markdown()
-        day2_output = gr.Markdown()
-        day3_output = gr.Markdown()
-        day4_output = gr.Markdown()
-        day5_output = gr.Markdown()
-        day6_output = gr.Markdown()
-        day7_output = gr.Markdown()
+    forecast_output = gr.HTML()
     
     gr.Markdown("---")
     
@@ -297,18 +308,73 @@ with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {bac
         
         with gr.Column():
             sunset_output = gr.Textbox(label="🌇 Sunset", interactive=False)
+        
+        with gr.Column():
+            solar_noon_output = gr.Textbox(label="☀️ Solar Noon", interactive=False)
+        
+        with gr.Column():
+            day_length_output = gr.Textbox(label="⏳ Day Length", interactive=False)
     
-    submit_btn.click(
-        fn=get_weather,
-        inputs=city_input,
+    daylight_chart = gr.Plot()
+    
+    gr.Markdown("---")
+    
+    gr.Markdown("## 🏙️ Compare Cities")
+    
+    compare_input = gr.Textbox(
+        label="Cities (comma or newline separated):",
+        value="Copenhagen, Oslo, Stockholm, Helsinki, Reykjavik",
+        lines=3
+    )
+    compare_variable = gr.Dropdown(
+        choices=[(label, variable) for variable, (label, _, _) in HEATMAP_VARIABLES.items()],
+        value="temperature_2m_max",
+        label="Heatmap"
+    )
+    compare_btn = gr.Button("Compare", variant="primary", elem_classes="primary-btn")
+    
+    compare_status = gr.Markdown()
+    compare_chart = gr.Plot()
+    compare_table = gr.Dataframe(interactive=False)
+    
+    # City list of the comparison on display, so a units switch re-renders it
+    compared_cities = gr.State()
+    
+    compare_btn.click(
+        fn=compare_cities,
+        inputs=[compare_input, compare_variable, units_input],
+        outputs=[compare_status, compare_chart, compare_table, compared_cities]
+    )
+    units_input.change(
+        fn=switch_comparison_units,
+        inputs=[compared_cities, compare_variable, units_input],
+        outputs=[compare_status, compare_chart, compare_table, compared_cities]
+    )
+    
+    with gr.Row():
+        export_section = gr.Radio(
+            choices=[(section.title(), section) for section in EXPORT_SECTIONS],
+            value="hourly",
+            label="Export"
+        )
+        export_format = gr.Radio(choices=[("CSV", "csv"), ("Parquet", "parquet")], value="csv", label="Format")
+    export_btn = gr.Button("⬇️ Download forecasts")
+    export_file = gr.File(label="Forecast export", interactive=False)
+    
+    export_btn.click(
+        fn=export_cities,
+        inputs=[compare_input, export_section, export_format, units_input],
+        outputs=export_file
+    )
+    
+    # City name or [lat, lon] on display, so live updates follow it rather than the inputs
+    current_city = gr.State()
+    
+    live_timer = gr.Timer(LIVE_POLL_INTERVAL)
+    live_timer.tick(
+        fn=get_live_weather,
+        inputs=[current_city, units_input],
         outputs=[
-            location_output,
-            temp_chart,
-            precip_chart,
-            uv_chart,
-            hourly_chart,
-            wind_chart,
-            gr.Textbox(visible=False),
             temp_output,
             feels_like_output,
             humidity_output,
@@ -318,51 +384,57 @@ with gr.Blocks(title="🌤️ Comprehensive Weather App", css=".primary-btn {bac
             wind_gusts_output,
             pressure_output,
             condition_output,
-            precipitation_output,
-            day1_output,
-            day2_output,
-            day3_output,
-            day4_output,
-            day5_output,
-            day6_output,
-            day7_output,
-            sunrise_output,
-            sunset_output
+            precipitation_output
         ]
     )
     
-    city_input.submit(
+    weather_outputs = [
+        location_output,
+        temp_chart,
+        precip_chart,
+        uv_chart,
+        hourly_chart,
+        wind_chart,
+        gr.Textbox(visible=False),
+        temp_output,
+        feels_like_output,
+        humidity_output,
+        cloud_output,
+        wind_speed_output,
+        wind_dir_output,
+        wind_gusts_output,
+        pressure_output,
+        condition_output,
+        precipitation_output,
+        forecast_output,
+        sunrise_output,
+        sunset_output,
+        solar_noon_output,
+        day_length_output,
+        daylight_chart,
+        current_city
+    ]
+    
+    # Enter and the button are one event: while it runs, further submits are
+    # collapsed into a single rerun with the latest input
+    weather_event = gr.on(
+        triggers=[submit_btn.click, city_input.submit],
         fn=get_weather,
-        inputs=city_input,
-        outputs=[
-            location_output,
-            temp_chart,
-            precip_chart,
-            uv_chart,
-            hourly_chart,
-            wind_chart,
-            gr.Textbox(visible=False),
-            temp_output,
-            feels_like_output,
-            humidity_output,
-            cloud_output,
-            wind_speed_output,
-            wind_dir_output,
-            wind_gusts_output,
-            pressure_output,
-            condition_output,
-            precipitation_output,
-            day1_output,
-            day2_output,
-            day3_output,
-            day4_output,
-            day5_output,
-            day6_output,
-            day7_output,
-            sunrise_output,
-            sunset_output
-        ]
+        inputs=[city_input, units_input],
+        outputs=weather_outputs,
+        trigger_mode="always_last"
+    )
+    units_input.change(fn=switch_units, inputs=[current_city, units_input], outputs=weather_outputs)
+    point_event = point_btn.click(
+        fn=get_point_weather,
+        inputs=[lat_input, lon_input, units_input],
+        outputs=weather_outputs,
+        trigger_mode="always_last",
+        cancels=[weather_event]
     )
+    # A city submit supersedes a pending coordinate lookup, and vice versa
+    gr.on(triggers=[submit_btn.click, city_input.submit], fn=None, cancels=[point_event])
+    area_btn.click(fn=area_map, inputs=[lat_input, lon_input, overlay_input, units_input], outputs=area_chart)
 
 if __name__ == "__main__":
     demo.launch()
@@ -1,46 +1,32 @@
 import streamlit as st
-import requests
-from datetime import datetime
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
 
+from weather_cards import render_day_cards
+from weather_core import (UpstreamUnavailable, get_city_forecast, get_location, get_weather_description,
+                          get_wind_direction, stale_notice)
+from weather_figures import figure_dicts
+from weather_solar import daylight_figure, sun_summary
+from weather_units import UNIT_SYSTEMS, convert_forecast, unit_label
 
-def get_coordinates(city):
-    geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1"
-    response = requests.get(geocode_url)
-    data = response.json()
 
-    if "results" in data and data["results"]:
-        result = data["results"][0]
-        return result["latitude"], result["longitude"], result.get("country", "")
-    else:
-        return None, None, None
-
-
-def get_weather_description(code):
-    """Convert WMO weather code to description"""
-    weather_codes = {
-        0: "☀️ Clear sky", 1: "🌤️ Mainly clear", 2: "⛅ Partly cloudy", 3: "☁️ Overcast",
-        45: "🌫️ Fog", 48: "🌫️ Depositing rime fog",
-        51: "🌦️ Light drizzle", 53: "🌦️ Moderate drizzle", 55: "🌧️ Dense drizzle",
-        56: "🌧️ Light freezing drizzle", 57: "🌧️ Dense freezing drizzle",
-        61: "🌧️ Slight rain", 63: "🌧️ Moderate rain", 65: "🌧️ Heavy rain",
-        66: "🌧️ Light freezing rain", 67: "🌧️ Heavy freezing rain",
-        71: "🌨️ Slight snow", 73: "🌨️ Moderate snow", 75: "❄️ Heavy snow", 77: "🌨️ Snow grains",
-        80: "🌦️ Slight rain showers", 81: "🌧️ Moderate rain showers", 82: "⛈️ Violent rain showers",
-        85: "🌨️ Slight snow showers", 86: "❄️ Heavy snow showers",
-        95: "⛈️ Thunderstorm", 96: "⛈️ Thunderstorm with slight hail", 99: "⛈️ Thunderstorm with heavy hail"
-    }
-    return weather_codes.get(code, "Unknown")
-
-
-def get_wind_direction(degrees):
-    """Convert wind direction degrees to compass direction"""
-    directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-    index = round(degrees / 22.5) % 16
-    return directions[index]
+def render_sun_times(lat, lon, timezone):
+    sun = sun_summary(lat, lon, timezone)
+    
+    st.subheader("🌅 Sun Times (Today)")
+    sun_col1, sun_col2, sun_col3, sun_col4 = st.columns(4)
+    
+    with sun_col1:
+        st.metric("🌅 Sunrise", sun['sunrise'])
+    
+    with sun_col2:
+        st.metric("🌇 Sunset", sun['sunset'])
+    
+    with sun_col3:
+        st.metric("☀️ Solar Noon", sun['solar_noon'])
+    
+    with sun_col4:
+        st.metric("⏳ Day Length", sun['day_length'])
+    
+    st.plotly_chart(daylight_figure(lat, lon, timezone), use_container_width=True)
 
 
 st.set_page_config(page_title="Weather App", page_icon="🌤️", layout="wide")
@@ -50,154 +36,59 @@ with st.form(key='weather_form'):
     city = st.text_input("Enter city name:", "Copenhagen")
     submit_button = st.form_submit_button("Get Weather")
 
+# Outside the form so switching units reruns at once, re-rendering the last
+# searched city from the cached forecast
+units = st.radio("Units", UNIT_SYSTEMS, format_func=str.title, horizontal=True)
+
 if submit_button:
-    lat, lon, country = get_coordinates(city)
+    st.session_state['city'] = city
+
+if 'city' in st.session_state:
+    city = st.session_state['city']
+    try:
+        forecast = get_city_forecast(city)
+    except UpstreamUnavailable:
+        st.error("❌ Weather service is temporarily unavailable. Please try again shortly.")
+        # Sun times need no network, so show them whenever the city is already geocoded
+        try:
+            location = get_location(city)
+        except UpstreamUnavailable:
+            location = None
+        if location is not None:
+            render_sun_times(location['latitude'], location['longitude'], location['timezone'])
+        st.stop()
     
-    if lat and lon:
-        weather_url = f"""https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,rain,weather_code,cloud_cover,pressure_msl,wind_speed_10m,wind_direction_10m,wind_gusts_10m&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,sunrise,sunset,uv_index_max&hourly=temperature_2m,precipitation_probability,wind_speed_10m&timezone=auto"""
-        
-        weather_response = requests.get(weather_url).json()
-        current = weather_response["current"]
-        daily = weather_response["daily"]
-        hourly = weather_response["hourly"]
+    if forecast is not None:
+        forecast = convert_forecast(forecast, units)
+        lat, lon, country = forecast.latitude, forecast.longitude, forecast.country
+        current = forecast.current
+        daily = forecast.daily
         
         # Header with location
         st.header(f"📍 {city}, {country}")
         st.caption(f"Coordinates: {lat:.2f}°, {lon:.2f}°")
+        if forecast.stale:
+            st.warning(stale_notice(forecast))
         
         # VISUALIZATIONS SECTION
         st.subheader("📊 Weather Visualizations")
         
-        # Create 7-day forecast chart
-        dates = [datetime.fromisoformat(d).strftime('%a %m/%d') for d in daily['time'][:7]]
-        
-        # Temperature Forecast Chart
-        fig_temp = go.Figure()
-        fig_temp.add_trace(go.Scatter(
-            x=dates, y=daily['temperature_2m_max'][:7],
-            mode='lines+markers',
-            name='High',
-            line=dict(color='#ff7043', width=3),
-            marker=dict(size=10)
-        ))
-        fig_temp.add_trace(go.Scatter(
-            x=dates, y=daily['temperature_2m_min'][:7],
-            mode='lines+markers',
-            name='Low',
-            line=dict(color='#42a5f5', width=3),
-            marker=dict(size=10),
-            fill='tonexty',
-            fillcolor='rgba(100, 149, 237, 0.2)'
-        ))
-        fig_temp.update_layout(
-            title='7-Day Temperature Forecast',
-            xaxis_title='Date',
-            yaxis_title='Temperature (°C)',
-            hovermode='x unified',
-            height=400
-        )
-        st.plotly_chart(fig_temp, use_container_width=True)
+        figures = figure_dicts(forecast, units)
+        st.plotly_chart(figures['temperature'], use_container_width=True)
         
         # Two column layout for next charts
         col_chart1, col_chart2 = st.columns(2)
         
         with col_chart1:
-            # Precipitation Probability Chart
-            fig_precip = go.Figure()
-            fig_precip.add_trace(go.Bar(
-                x=dates,
-                y=daily['precipitation_probability_max'][:7],
-                marker=dict(
-                    color=daily['precipitation_probability_max'][:7],
-                    colorscale='Blues',
-                    showscale=True,
-                    colorbar=dict(title="Probability %")
-                ),
-                text=[f"{p}%" for p in daily['precipitation_probability_max'][:7]],
-                textposition='outside'
-            ))
-            fig_precip.update_layout(
-                title='Rain Probability (7 Days)',
-                xaxis_title='Date',
-                yaxis_title='Probability (%)',
-                height=400
-            )
-            st.plotly_chart(fig_precip, use_container_width=True)
+            st.plotly_chart(figures['precipitation'], use_container_width=True)
         
         with col_chart2:
-            # UV Index Chart
-            fig_uv = go.Figure()
-            colors = ['#4caf50' if uv <= 2 else '#ffeb3b' if uv <= 5 else '#ff9800' if uv <= 7 else '#f44336' 
-                     for uv in daily['uv_index_max'][:7]]
-            fig_uv.add_trace(go.Bar(
-                x=dates,
-                y=daily['uv_index_max'][:7],
-                marker=dict(color=colors),
-                text=daily['uv_index_max'][:7],
-                textposition='outside'
-            ))
-            fig_uv.update_layout(
-                title='UV Index (7 Days)',
-                xaxis_title='Date',
-                yaxis_title='UV Index',
-                height=400
-            )
-            st.plotly_chart(fig_uv, use_container_width=True)
-        
-        # 24-Hour Hourly Forecast
-        hourly_times = [datetime.fromisoformat(t).strftime('%H:%M') for t in hourly['time'][:24]]
-        
-        fig_hourly = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=('Temperature (Next 24 Hours)', 'Wind Speed (Next 24 Hours)'),
-            vertical_spacing=0.15
-        )
-        
-        fig_hourly.add_trace(go.Scatter(
-            x=hourly_times,
-            y=hourly['temperature_2m'][:24],
-            mode='lines',
-            name='Temperature',
-            line=dict(color='#ff6b6b', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(255, 107, 107, 0.2)'
-        ), row=1, col=1)
+            st.plotly_chart(figures['uv'], use_container_width=True)
         
-        fig_hourly.add_trace(go.Scatter(
-            x=hourly_times,
-            y=hourly['wind_speed_10m'][:24],
-            mode='lines',
-            name='Wind Speed',
-            line=dict(color='#4ecdc4', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(78, 205, 196, 0.2)'
-        ), row=2, col=1)
-        
-        fig_hourly.update_xaxes(title_text="Time", row=2, col=1)
-        fig_hourly.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
-        fig_hourly.update_yaxes(title_text="Wind Speed (km/h)", row=2, col=1)
-        fig_hourly.update_layout(height=600, showlegend=False)
-        
-        st.plotly_chart(fig_hourly, use_container_width=True)
+        st.plotly_chart(figures['hourly'], use_container_width=True)
         
         # Wind Rose (Polar chart for current wind)
-        fig_wind = go.Figure()
-        fig_wind.add_trace(go.Barpolar(
-            r=[current['wind_speed_10m']],
-            theta=[current['wind_direction_10m']],
-            marker=dict(color='#00bcd4', line=dict(color='#006064', width=2)),
-            width=[20],
-            name='Wind'
-        ))
-        fig_wind.update_layout(
-            title='Current Wind Direction & Speed',
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, max(current['wind_speed_10m'] * 1.5, 20)]),
-                angularaxis=dict(direction='clockwise', rotation=90)
-            ),
-            height=400
-        )
-        st.plotly_chart(fig_wind, use_container_width=True)
+        st.plotly_chart(figures['wind'], use_container_width=True)
         
         st.divider()
         
@@ -207,8 +98,8 @@ if submit_button:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Temperature", f"{current['temperature_2m']}°C")
-            st.metric("Feels Like", f"{current['apparent_temperature']}°C")
+            st.metric("Temperature", f"{current['temperature_2m']}{unit_label('temperature', units)}")
+            st.metric("Feels Like", f"{current['apparent_temperature']}{unit_label('temperature', units)}")
         
         with col2:
             st.metric("Humidity", f"{current['relative_humidity_2m']}%")
@@ -216,54 +107,32 @@ if submit_button:
         
         with col3:
             wind_dir = get_wind_direction(current['wind_direction_10m'])
-            st.metric("Wind Speed", f"{current['wind_speed_10m']} km/h")
+            st.metric("Wind Speed", f"{current['wind_speed_10m']} {unit_label('speed', units)}")
             st.metric("Wind Direction", f"{wind_dir} ({current['wind_direction_10m']}°)")
         
         with col4:
-            st.metric("Wind Gusts", f"{current['wind_gusts_10m']} km/h")
-            st.metric("Pressure", f"{current['pressure_msl']} hPa")
+            st.metric("Wind Gusts", f"{current['wind_gusts_10m']} {unit_label('speed', units)}")
+            st.metric("Pressure", f"{current['pressure_msl']} {unit_label('pressure', units)}")
         
         # Weather Condition
         st.info(f"**Condition:** {get_weather_description(current['weather_code'])}")
         
         # Precipitation
         if current['precipitation'] > 0:
-            st.warning(f"💧 **Precipitation:** {current['precipitation']} mm | **Rain:** {current['rain']} mm")
+            precipitation_unit = unit_label('precipitation', units)
+            st.warning(f"💧 **Precipitation:** {current['precipitation']} {precipitation_unit} | "
+                       f"**Rain:** {current['rain']} {precipitation_unit}")
         
         st.divider()
         
-        # 7-Day Forecast Table
-        st.subheader("📅 7-Day Forecast")
-        
-        forecast_cols = st.columns(7)
-        
-        for i in range(7):
-            with forecast_cols[i]:
-                date = datetime.fromisoformat(daily['time'][i])
-                st.markdown(f"**{date.strftime('%a %m/%d')}**")
-                st.metric("High", f"{daily['temperature_2m_max'][i]}°C")
-                st.metric("Low", f"{daily['temperature_2m_min'][i]}°C")
-                
-                if daily['precipitation_probability_max'][i]:
-                    st.caption(f"💧 {daily['precipitation_probability_max'][i]}%")
-                if daily['precipitation_sum'][i] > 0:
-                    st.caption(f"🌧️ {daily['precipitation_sum'][i]} mm")
-                
-                st.caption(f"☀️ UV: {daily['uv_index_max'][i]}")
+        # Day cards, rendered in one pass as a single HTML block
+        st.subheader(f"📅 {len(daily['time'])}-Day Forecast")
+        st.markdown(render_day_cards(daily, units=units), unsafe_allow_html=True)
         
         st.divider()
         
-        # Sun Times for Today
-        st.subheader("🌅 Sun Times (Today)")
-        sun_col1, sun_col2 = st.columns(2)
-        
-        with sun_col1:
-            sunrise = datetime.fromisoformat(daily['sunrise'][0])
-            st.metric("🌅 Sunrise", sunrise.strftime('%H:%M'))
-        
-        with sun_col2:
-            sunset = datetime.fromisoformat(daily['sunset'][0])
-            st.metric("🌇 Sunset", sunset.strftime('%H:%M'))
+        # Sun Times for Today, computed locally
+        render_sun_times(lat, lon, forecast.timezone)
             
     else:
         st.error("❌ City not found. Please check the spelling.")
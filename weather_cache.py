@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+POLICIES = ('lru', 'lfu')
+
+# Default for get() when a cached None must be told apart from a miss
+MISSING = object()
+
+
+def approximate_size(obj, _seen=None):
+    """Rough resident size of obj in bytes, following containers and numpy buffers"""
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k, _seen) + approximate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += approximate_size(vars(obj), _seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'hits')
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.hits = 0
+
+
+class BoundedCache:
+    """Cache shared by several namespaces under one memory budget
+
+    Each entry's size is estimated when it is stored. When the total goes
+    over max_bytes, entries are evicted across all namespaces by least
+    recent use ('lru') or least frequent use ('lfu', ties broken by age).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, policy='lru'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries = OrderedDict()
+        self._resident = 0
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'bytes': 0})
+        self._lock = threading.RLock()
+
+    def namespace(self, name):
+        return CacheNamespace(self, name)
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            stats = self._stats[namespace]
+            if entry is None:
+                stats['misses'] += 1
+                return default
+            stats['hits'] += 1
+            entry.hits += 1
+            self._entries.move_to_end((namespace, key))
+            return entry.value
+
+    def set(self, namespace, key, value):
+        size = approximate_size(value)
+        with self._lock:
+            self._discard((namespace, key))
+            if size > self.max_bytes:
+                self._stats[namespace]['evictions'] += 1
+                return
+            self._entries[(namespace, key)] = _Entry(value, size)
+            self._resident += size
+            stats = self._stats[namespace]
+            stats['entries'] += 1
+            stats['bytes'] += size
+            while self._resident > self.max_bytes:
+                self._evict()
+
+    def pop(self, namespace, key):
+        with self._lock:
+            entry = self._discard((namespace, key))
+            return None if entry is None else entry.value
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for full_key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._discard(full_key)
+
+    def _discard(self, full_key):
+        entry = self._entries.pop(full_key, None)
+        if entry is not None:
+            self._resident -= entry.size
+            stats = self._stats[full_key[0]]
+            stats['entries'] -= 1
+            stats['bytes'] -= entry.size
+        return entry
+
+    def _evict(self):
+        if self.policy == 'lfu':
+            # OrderedDict iterates oldest first, so min() keeps the least recently used among equals
+            victim = min(self._entries, key=lambda k: self._entries[k].hits)
+        else:
+            victim = next(iter(self._entries))
+        self._discard(victim)
+        self._stats[victim[0]]['evictions'] += 1
+
+    def stats(self):
+        """Hit ratio, evictions, entries and resident bytes per namespace, plus totals"""
+        with self._lock:
+            namespaces = {}
+            for name, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses']
+                namespaces[name] = {**stats, 'hit_ratio': stats['hits'] / lookups if lookups else 0.0}
+            return {
+                'policy': self.policy,
+                'max_bytes': self.max_bytes,
+                'resident_bytes': self._resident,
+                'namespaces': namespaces,
+            }
+
+
+class CacheNamespace:
+    """View of a BoundedCache restricted to one namespace"""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.cache.get(self.name, key, default)
+
+    def set(self, key, value):
+        self.cache.set(self.name, key, value)
+
+    def pop(self, key):
+        return self.cache.pop(self.name, key)
+
+    def clear(self):
+        self.cache.clear(self.name)
+
+
+weather_cache = BoundedCache(
+    max_bytes=int(os.environ.get('WEATHER_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+    policy=os.environ.get('WEATHER_CACHE_POLICY', 'lru'),
+)
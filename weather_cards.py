@@ -0,0 +1,77 @@
+from string import Formatter
+
+import numpy as np
+import pandas as pd
+
+from weather_units import unit_label
+
+DAY_CARD_TEMPLATE = (
+    '<div style="flex: 1; padding: 15px; border: 1px solid #ddd; border-radius: 5px; '
+    'background-color: #f9f9f9; min-width: 120px;">'
+    '<strong style="font-size: 16px; margin-bottom: 10px; display: block;">{label}</strong>'
+    '<div style="margin-bottom: 10px;"><div style="font-size: 12px; color: #666;">High</div>'
+    '<div style="font-size: 24px; color: #d62728; font-weight: bold;">{high}</div></div>'
+    '<div style="margin-bottom: 10px;"><div style="font-size: 12px; color: #666;">Low</div>'
+    '<div style="font-size: 24px; color: #1f77b4; font-weight: bold;">{low}</div></div>'
+    '<div style="font-size: 12px; margin-bottom: 5px;">{precip_probability}</div>'
+    '<div style="font-size: 12px; margin-bottom: 5px;">{precip_sum}</div>'
+    '<div style="font-size: 12px; color: #666;">{uv}</div>'
+    '</div>'
+)
+DAY_CARDS_CONTAINER = '<div style="display: flex; gap: 15px; overflow-x: auto;">{cards}</div>'
+
+
+def compile_template(template):
+    """Split a str.format template into (literal, field) pairs once, at import time"""
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+
+_DAY_CARD = compile_template(DAY_CARD_TEMPLATE)
+
+
+def _render(compiled, columns, length):
+    """Fill a compiled template for every row at once by concatenating whole string columns"""
+    out = np.full(length, '', dtype=object)
+    for literal, field in compiled:
+        out = out + literal
+        if field is not None:
+            out = out + columns[field]
+    return out
+
+
+def _text(values, prefix, suffix=''):
+    """Wrap each value in prefix/suffix as a string column, blank where the value is missing"""
+    values = np.array(values, dtype=object)
+    out = prefix + values.astype(str).astype(object) + suffix
+    out[values == None] = ''  # noqa: E711 - elementwise comparison
+    return out
+
+
+def format_dates(dates, fmt='%a %m/%d'):
+    """Format ISO dates as one array operation instead of a fromisoformat/strftime per day"""
+    return np.array(pd.DatetimeIndex(np.array(dates, dtype='datetime64[D]')).strftime(fmt), dtype=object)
+
+
+def day_card_fields(daily, days=None, units='metric'):
+    """Formatted text for every field of every day card, as string columns"""
+    days = len(daily['time']) if days is None else days
+    precip_probability = np.nan_to_num(np.array(daily['precipitation_probability_max'][:days], dtype=float))
+    precip_sum = np.nan_to_num(np.array(daily['precipitation_sum'][:days], dtype=float))
+    temperature_unit, precipitation_unit = unit_label('temperature', units), unit_label('precipitation', units)
+
+    return {
+        'label': format_dates(daily['time'][:days]),
+        'high': _text(daily['temperature_2m_max'][:days], '', temperature_unit),
+        'low': _text(daily['temperature_2m_min'][:days], '', temperature_unit),
+        'precip_probability': np.where(precip_probability > 0,
+                                       _text(daily['precipitation_probability_max'][:days], '💧 ', '%'), ''),
+        'precip_sum': np.where(precip_sum > 0, _text(daily['precipitation_sum'][:days], '🌧️ ', f' {precipitation_unit}'), ''),
+        'uv': _text(daily['uv_index_max'][:days], '☀️ UV: '),
+    }
+
+
+def render_day_cards(daily, days=None, units='metric'):
+    """HTML for all day cards in one flex row, shared by the Dash, Gradio and Streamlit front-ends"""
+    fields = day_card_fields(daily, days, units)
+    cards = _render(_DAY_CARD, fields, len(fields['label']))
+    return DAY_CARDS_CONTAINER.format(cards=''.join(cards))
@@ -0,0 +1,87 @@
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from weather_units import unit_label
+
+MAX_COMPARE_CITIES = 100
+
+# Heatmap variable -> (label, unit kind or None, colorscale)
+HEATMAP_VARIABLES = {
+    'temperature_2m_max': ('High Temperature', 'temperature', 'RdYlBu_r'),
+    'temperature_2m_min': ('Low Temperature', 'temperature', 'RdYlBu_r'),
+    'precipitation_sum': ('Precipitation', 'precipitation', 'Blues'),
+    'uv_index_max': ('UV Index', None, 'YlOrRd'),
+    'wind_gusts_10m_max': ('Wind Gusts', 'speed', 'Purples'),
+}
+
+AGGREGATE_VARIABLES = ['temperature_2m_min', 'temperature_2m_max', 'precipitation_sum',
+                       'uv_index_max', 'wind_gusts_10m_max']
+
+
+def parse_city_list(text):
+    """Split comma, semicolon or newline separated city names, dropping blanks and duplicates"""
+    names = (name.strip() for name in re.split(r'[,;\n]', text or ''))
+    return list(dict.fromkeys(name for name in names if name))[:MAX_COMPARE_CITIES]
+
+
+def location_labels(forecasts):
+    return [f"{f.city}, {f.country}" if f.country else f.city for f in forecasts]
+
+
+def stack_daily(forecasts, variables, days=7):
+    """Stack daily series into a (variables x locations x days) float array with NaN for gaps"""
+    return np.array([[f.daily[v][:days] for f in forecasts] for v in variables], dtype=float)
+
+
+def compare_forecasts(forecasts, days=7, units='metric'):
+    """Weekly extremes per location, computed over the stacked daily arrays
+
+    The forecasts must already be converted to units; they only pick the column names.
+    """
+    t_min, t_max, precip, uv, gusts = stack_daily(forecasts, AGGREGATE_VARIABLES, days)
+    temperature_unit, speed_unit = unit_label('temperature', units), unit_label('speed', units)
+    precip_column = f"Total Precip ({unit_label('precipitation', units)})"
+
+    # Locations with an all-missing series produce NaN rather than a warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        table = pd.DataFrame({
+            'City': location_labels(forecasts),
+            f'Min Temp ({temperature_unit})': np.nanmin(t_min, axis=1),
+            f'Max Temp ({temperature_unit})': np.nanmax(t_max, axis=1),
+            precip_column: np.nansum(precip, axis=1),
+            'Peak UV': np.nanmax(uv, axis=1),
+            f'Max Gust ({speed_unit})': np.nanmax(gusts, axis=1),
+        })
+    # Inches of rain keep the extra decimal they were converted with
+    decimals = dict.fromkeys(table.columns[1:], 1)
+    decimals[precip_column] = 2 if units == 'imperial' else 1
+    return table.round(decimals)
+
+
+def comparison_heatmap(forecasts, variable='temperature_2m_max', days=7, units='metric'):
+    """Heatmap of one daily variable for every location; forecasts must already be in units"""
+    label, kind, colorscale = HEATMAP_VARIABLES[variable]
+    title = f"{label} ({unit_label(kind, units)})" if kind else label
+    values = stack_daily(forecasts, [variable], days)[0]
+    dates = pd.to_datetime(forecasts[0].daily['time'][:days]).strftime('%a %m/%d')
+
+    fig = go.Figure(go.Heatmap(
+        z=values,
+        x=list(dates),
+        y=location_labels(forecasts),
+        colorscale=colorscale,
+        colorbar=dict(title=title),
+        hoverongaps=False
+    ))
+    fig.update_layout(
+        title=f'{title} by City',
+        xaxis_title='Date',
+        yaxis=dict(autorange='reversed'),
+        height=max(400, 150 + 28 * len(forecasts))
+    )
+    return fig
@@ -0,0 +1,482 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import requests
+
+from weather_cache import MISSING, weather_cache
+from weather_transport import get_transport
+
+GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+CURRENT_VARIABLES = [
+    "temperature_2m", "relative_humidity_2m", "apparent_temperature", "precipitation", "rain",
+    "weather_code", "cloud_cover", "pressure_msl", "wind_speed_10m", "wind_direction_10m", "wind_gusts_10m"
+]
+DAILY_VARIABLES = [
+    "temperature_2m_max", "temperature_2m_min", "precipitation_sum", "precipitation_probability_max",
+    "uv_index_max", "wind_gusts_10m_max"
+]
+HOURLY_VARIABLES = ["temperature_2m", "precipitation_probability", "wind_speed_10m", "wind_gusts_10m", "uv_index"]
+
+# Days of daily forecast to request; Open-Meteo serves up to 16
+FORECAST_DAYS = 7
+
+# Open-Meteo refreshes its models at most every 15 minutes, so a forecast
+# younger than that is as fresh as anything upstream can give us.
+FORECAST_TTL = 15 * 60
+
+# Open-Meteo accepts comma-separated coordinate lists, so cache misses for
+# many locations are fetched in chunks of this size instead of one by one.
+FORECAST_BATCH_SIZE = 50
+GEOCODE_WORKERS = 8
+
+# (connect, read) timeout for every upstream call
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Outbound token bucket: sustained requests per second and burst size.
+# Callers wait at most RATE_LIMIT_WAIT seconds for a token; bulk geocoding
+# queues for up to BULK_RATE_LIMIT_WAIT so a long city list is paced, not failed.
+RATE_LIMIT_PER_SECOND = 5
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_WAIT = 2
+BULK_RATE_LIMIT_WAIT = 30
+
+# The breaker opens after this many consecutive failures; calls slower than
+# the latency threshold count as failures. After the reset timeout a single
+# trial call is let through to probe whether upstream has recovered.
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_LATENCY_THRESHOLD = 5.0
+BREAKER_RESET_TIMEOUT = 30
+
+# Seconds a finished computation keeps answering identical calls, so a
+# double submit (Enter plus a click) joins the first one instead of rerunning
+SINGLE_FLIGHT_WINDOW = 2
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when Open-Meteo cannot be reached and there is no cached data to fall back on"""
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Take a token, waiting up to timeout seconds; return False if none would be available in time
+
+        A caller that has to wait reserves its token up front, so waiting
+        callers are served in arrival order at the refill rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(1 - self._tokens, 0) / self.rate
+            if wait > timeout:
+                return False
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, latency_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_until = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go upstream; after the reset timeout only one trial call is allowed"""
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return True
+            if self._opened_until > time.monotonic() or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self, latency):
+        if latency > self.latency_threshold:
+            self.record_failure()
+            return
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                self._opened_until = time.monotonic() + self.reset_timeout
+
+    def trip(self, duration):
+        """Open immediately, e.g. when upstream answers 429 with a Retry-After"""
+        with self._lock:
+            self._failures = max(self._failures, self.failure_threshold)
+            self._trial_in_flight = False
+            self._opened_until = time.monotonic() + max(duration, self.reset_timeout)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'finished')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = None
+
+
+class SingleFlight:
+    """Run at most one computation per key; concurrent and recent duplicate calls share its result
+
+    A result is reused for `window` seconds after it finishes. Failures are
+    shared with callers that were already waiting but never reused.
+    """
+
+    def __init__(self, window=0):
+        self.window = window
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            now = time.monotonic()
+            expired = [k for k, c in self._calls.items() if c.finished is not None and now - c.finished >= self.window]
+            for k in expired:
+                del self._calls[k]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            with self._lock:
+                self._calls.pop(key, None)
+            raise
+        finally:
+            call.finished = time.monotonic()
+            call.done.set()
+        return call.result
+
+
+_rate_limiter = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_LATENCY_THRESHOLD, BREAKER_RESET_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+_geocode_cache = weather_cache.namespace("geocode")
+_forecast_cache = weather_cache.namespace("forecast")
+_refresh_listeners = []
+_city_flights = SingleFlight()
+
+
+def _get_json(url, params, wait=RATE_LIMIT_WAIT):
+    """GET an Open-Meteo endpoint through the rate limiter and circuit breaker
+
+    Requests go through the transport picked by WEATHER_TRANSPORT; replayed
+    fixtures skip the limiter and breaker since nothing reaches upstream.
+    """
+    transport = get_transport()
+    if not transport.upstream:
+        try:
+            return transport.get(url, params, REQUEST_TIMEOUT).json()
+        except (requests.RequestException, ValueError) as exc:
+            raise UpstreamUnavailable(str(exc)) from exc
+
+    if not _rate_limiter.acquire(wait):
+        raise UpstreamUnavailable("Outbound rate limit exceeded")
+    if not _breaker.allow():
+        raise UpstreamUnavailable("Circuit breaker is open")
+
+    start = time.monotonic()
+    try:
+        response = transport.get(url, params, REQUEST_TIMEOUT)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            _breaker.trip(int(retry_after) if retry_after.isdigit() else 0)
+            raise UpstreamUnavailable("Rate limited by Open-Meteo")
+        response.raise_for_status()
+        data = response.json()
+    except (requests.RequestException, ValueError) as exc:
+        _breaker.record_failure()
+        raise UpstreamUnavailable(str(exc)) from exc
+
+    _breaker.record_success(time.monotonic() - start)
+    return data
+
+
+@dataclass
+class Forecast:
+    city: str
+    country: str
+    latitude: float
+    longitude: float
+    timezone: str
+    current: dict
+    daily: dict
+    hourly: dict
+    fetched_at: float
+    expires_at: float
+    stale: bool = False
+
+    @property
+    def max_age(self):
+        """Seconds until the cached forecast expires"""
+        return max(int(self.expires_at - time.time()), 0)
+
+    @property
+    def etag(self):
+        """Validator that changes whenever the underlying forecast is refetched"""
+        key = f"{self.city}|{self.latitude}|{self.longitude}|{self.fetched_at}"
+        return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+
+def get_location(city, wait=RATE_LIMIT_WAIT):
+    """Geocode a city to a dict with latitude, longitude, country and timezone, or None if unknown"""
+    key = city.strip().lower()
+    location = _geocode_cache.get(key, MISSING)
+    if location is not MISSING:
+        return location
+
+    data = _get_json(GEOCODE_URL, {"name": city, "count": 1}, wait)
+
+    if "results" in data and data["results"]:
+        result = data["results"][0]
+        location = {
+            "latitude": result["latitude"],
+            "longitude": result["longitude"],
+            "country": result.get("country", ""),
+            "timezone": result.get("timezone"),
+        }
+    else:
+        location = None
+
+    _geocode_cache.set(key, location)
+    return location
+
+
+def get_coordinates(city):
+    location = get_location(city)
+    if location is None:
+        return None, None, None
+    return location["latitude"], location["longitude"], location["country"]
+
+
+def location_key(lat, lon):
+    return (round(lat, 4), round(lon, 4))
+
+
+def add_refresh_listener(listener):
+    """Call listener(key, data) whenever a location's forecast is refetched from upstream"""
+    _refresh_listeners.append(listener)
+
+
+def _get_batch(locations, params):
+    """One forecast request for several (lat, lon) pairs, returning one result per location"""
+    data = _get_json(FORECAST_URL, {
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lon) for _, lon in locations),
+        **params,
+    })
+    # A single location comes back as an object, several as a list
+    return [data] if isinstance(data, dict) else data
+
+
+def get_forecasts(locations):
+    """Fetch raw forecasts for many (lat, lon) pairs, batching cache misses into few upstream requests
+
+    Each entry is (data, fetched_at, expires_at). If upstream fails, expired
+    entries are returned as-is and locations that were never fetched are None;
+    UpstreamUnavailable is raised only when no location can be answered.
+    """
+    keys = [location_key(lat, lon) for lat, lon in locations]
+    now = time.time()
+    entries = {}
+    for key in dict.fromkeys(keys):
+        entry = _forecast_cache.get(key)
+        if entry is not None and entry[2] > now:
+            entries[key] = entry
+
+    missing = [key for key in dict.fromkeys(keys) if key not in entries]
+    error = None
+    for start in range(0, len(missing), FORECAST_BATCH_SIZE):
+        chunk = missing[start:start + FORECAST_BATCH_SIZE]
+        params = {
+            "current": ",".join(CURRENT_VARIABLES),
+            "daily": ",".join(DAILY_VARIABLES),
+            "hourly": ",".join(HOURLY_VARIABLES),
+            "forecast_days": FORECAST_DAYS,
+            "timezone": "auto",
+        }
+        try:
+            data = _get_batch(chunk, params)
+        except UpstreamUnavailable as exc:
+            error = exc
+            entries.update((key, _forecast_cache.get(key)) for key in chunk)
+            continue
+
+        fetched_at = time.time()
+        fetched = {key: (item, fetched_at, fetched_at + FORECAST_TTL) for key, item in zip(chunk, data)}
+        entries.update(fetched)
+        for key, entry in fetched.items():
+            _forecast_cache.set(key, entry)
+        for key, (item, _, _) in fetched.items():
+            for listener in _refresh_listeners:
+                try:
+                    listener(key, item)
+                except Exception:
+                    logger.exception("Forecast refresh listener failed for %s", key)
+
+    if error is not None and all(entry is None for entry in entries.values()):
+        raise error
+    return [entries[key] for key in keys]
+
+
+def get_current_conditions(locations):
+    """Fresh current conditions for many (lat, lon) pairs, bypassing the forecast cache"""
+    keys = [location_key(lat, lon) for lat, lon in locations]
+    current = []
+    for start in range(0, len(keys), FORECAST_BATCH_SIZE):
+        chunk = keys[start:start + FORECAST_BATCH_SIZE]
+        data = _get_batch(chunk, {"current": ",".join(CURRENT_VARIABLES), "timezone": "auto"})
+        current.extend(item["current"] for item in data)
+    return current
+
+
+def get_forecast(lat, lon):
+    """Fetch the raw Open-Meteo forecast for a location, reusing it until it expires
+
+    A location that has never been fetched raises UpstreamUnavailable while upstream is down.
+    """
+    return get_forecasts([(lat, lon)])[0]
+
+
+def _build_forecast(city, location, entry):
+    data, fetched_at, expires_at = entry
+    return Forecast(
+        city=city,
+        country=location["country"],
+        latitude=location["latitude"],
+        longitude=location["longitude"],
+        timezone=data.get("timezone") or location["timezone"],
+        current=data["current"],
+        daily=data["daily"],
+        hourly=data["hourly"],
+        fetched_at=fetched_at,
+        expires_at=expires_at,
+        stale=expires_at <= time.time(),
+    )
+
+
+def get_city_forecast(city):
+    """Geocode a city and return its Forecast, or None if the city is unknown
+
+    Concurrent lookups of the same city share one geocode and fetch.
+    """
+    return _city_flights.do(city.strip(), lambda: get_city_forecasts([city])[0])
+
+
+def _bulk_location(city):
+    """Geocode one city of a batch; an unreachable geocoder is a miss for that city only"""
+    try:
+        return get_location(city, BULK_RATE_LIMIT_WAIT)
+    except UpstreamUnavailable as exc:
+        logger.warning("Could not geocode %s: %s", city, exc)
+        return MISSING
+
+
+def get_city_forecasts(cities):
+    """Forecasts for many cities in input order, None for cities that could not be geocoded
+
+    In a batch, a city the geocoder could not be asked about is also None, as
+    is one whose forecast was never cached while upstream is down.
+    UpstreamUnavailable is raised only when no city can be answered.
+    """
+    if not cities:
+        return []
+    if len(cities) == 1:
+        locations = [get_location(cities[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(cities), GEOCODE_WORKERS)) as pool:
+            locations = list(pool.map(_bulk_location, cities))
+        if all(location is MISSING for location in locations):
+            raise UpstreamUnavailable("Geocoding service is unavailable")
+        locations = [None if location is MISSING else location for location in locations]
+
+    found = [i for i, location in enumerate(locations) if location is not None]
+    entries = get_forecasts([(locations[i]["latitude"], locations[i]["longitude"]) for i in found])
+
+    forecasts = [None] * len(cities)
+    for i, entry in zip(found, entries):
+        if entry is not None:
+            forecasts[i] = _build_forecast(cities[i], locations[i], entry)
+    return forecasts
+
+
+def coordinates_label(lat, lon):
+    return f"{lat:.2f}°, {lon:.2f}°"
+
+
+def get_point_forecast(lat, lon):
+    """Forecast for coordinates picked on a map; no geocoding, so the country is left blank"""
+    location = {"latitude": lat, "longitude": lon, "country": "", "timezone": None}
+    return _build_forecast(coordinates_label(lat, lon), location, get_forecast(lat, lon))
+
+
+def stale_notice(forecast):
+    """Banner text for forecasts served from cache while upstream is unavailable"""
+    if not forecast.stale:
+        return ""
+    as_of = datetime.fromtimestamp(forecast.fetched_at).strftime('%a %H:%M')
+    return f"⚠️ Weather service is unavailable. Showing data as of {as_of}."
+
+
+def get_weather_description(code):
+    """Convert WMO weather code to description"""
+    weather_codes = {
+        0: "☀️ Clear sky", 1: "🌤️ Mainly clear", 2: "⛅ Partly cloudy", 3: "☁️ Overcast",
+        45: "🌫️ Fog", 48: "🌫️ Depositing rime fog",
+        51: "🌦️ Light drizzle", 53: "🌦️ Moderate drizzle", 55: "🌧️ Dense drizzle",
+        56: "🌧️ Light freezing drizzle", 57: "🌧️ Dense freezing drizzle",
+        61: "🌧️ Slight rain", 63: "🌧️ Moderate rain", 65: "🌧️ Heavy rain",
+        66: "🌧️ Light freezing rain", 67: "🌧️ Heavy freezing rain",
+        71: "🌨️ Slight snow", 73: "🌨️ Moderate snow", 75: "❄️ Heavy snow", 77: "🌨️ Snow grains",
+        80: "🌦️ Slight rain showers", 81: "🌧️ Moderate rain showers", 82: "⛈️ Violent rain showers",
+        85: "🌨️ Slight snow showers", 86: "❄️ Heavy snow showers",
+        95: "⛈️ Thunderstorm", 96: "⛈️ Thunderstorm with slight hail", 99: "⛈️ Thunderstorm with heavy hail"
+    }
+    return weather_codes.get(code, "Unknown")
+
+
+def get_wind_direction(degrees):
+    """Convert wind direction degrees to compass direction"""
+    directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+    index = round(degrees / 22.5) % 16
+    return directions[index]
@@ -0,0 +1,155 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from weather_core import (DAILY_VARIABLES, FORECAST_BATCH_SIZE, HOURLY_VARIABLES, UpstreamUnavailable,
+                          get_city_forecasts)
+from weather_units import convert_section, unit_column
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPORT_CITIES = 1000
+EXPORT_SECTIONS = {'daily': DAILY_VARIABLES, 'hourly': HOURLY_VARIABLES}
+
+# Cities fetched, converted and written per chunk; only one chunk is held in
+# memory at a time however many cities are exported.
+EXPORT_CHUNK_SIZE = FORECAST_BATCH_SIZE
+
+# A chunk after the first that hits an unavailable upstream is retried this
+# many times, EXPORT_RETRY_DELAY seconds apart. The first chunk fails at once,
+# since the API can still answer 503 before any data has been sent.
+EXPORT_RETRIES = 2
+EXPORT_RETRY_DELAY = 5
+
+
+def _chunk_forecasts(chunk, retries):
+    attempt = 0
+    while True:
+        try:
+            return get_city_forecasts(chunk)
+        except UpstreamUnavailable:
+            if attempt == retries:
+                raise
+            attempt += 1
+            logger.warning("Export chunk failed, retrying in %ss (%d/%d)", EXPORT_RETRY_DELAY, attempt, retries)
+            time.sleep(EXPORT_RETRY_DELAY)
+
+
+def export_frames(cities, section='hourly', units='metric'):
+    """Yield one long-format DataFrame per chunk of cities, skipping cities that cannot be geocoded
+
+    `time` is local to each city, named by the `timezone` column, and each
+    variable's column name ends in its unit (temperature_2m_fahrenheit).
+    If a chunk still cannot be fetched after its retries, UpstreamUnavailable
+    is raised mid-iteration and the export is left unfinished.
+    """
+    variables = EXPORT_SECTIONS[section]
+    for start in range(0, len(cities), EXPORT_CHUNK_SIZE):
+        chunk = cities[start:start + EXPORT_CHUNK_SIZE]
+        forecasts = _chunk_forecasts(chunk, EXPORT_RETRIES if start else 0)
+        found = [(city, f) for city, f in zip(chunk, forecasts) if f is not None]
+        data = [convert_section(getattr(f, section), units) for _, f in found]
+        lengths = [len(d['time']) for d in data]
+
+        def repeat(values):
+            return np.repeat(np.array(values, dtype=object), lengths)
+
+        frame = pd.DataFrame({
+            'city': repeat([city for city, _ in found]),
+            'country': repeat([f.country for _, f in found]),
+            'latitude': np.repeat(np.array([f.latitude for _, f in found], dtype=float), lengths),
+            'longitude': np.repeat(np.array([f.longitude for _, f in found], dtype=float), lengths),
+            'timezone': repeat([f.timezone for _, f in found]),
+            'time': pd.to_datetime(np.concatenate([d['time'] for d in data]) if data else []),
+            **{
+                unit_column(v, units): np.concatenate([np.array(d.get(v, [None] * n), dtype=float) for d, n in zip(data, lengths)])
+                if data else np.array([], dtype=float)
+                for v in variables
+            },
+        })
+        yield frame
+
+
+def stream_csv(frames):
+    """CSV bytes chunk by chunk, with the header written once"""
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+class _ChunkSink:
+    """Write-only file for pyarrow that hands out what was written so far"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_parquet(frames, section='hourly', units='metric'):
+    """Parquet bytes with one row group per chunk, yielded as each row group is written
+
+    The footer is only yielded once every frame is written, so a stream cut
+    short by an error is not a readable Parquet file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [('city', pa.string()), ('country', pa.string()), ('latitude', pa.float64()), ('longitude', pa.float64()),
+         ('timezone', pa.string()), ('time', pa.timestamp('s'))]
+        + [(unit_column(v, units), pa.float64()) for v in EXPORT_SECTIONS[section]]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    for frame in frames:
+        writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# Format -> mimetype
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_forecasts(cities, section='hourly', units='metric', fmt='csv'):
+    """Stream the section of every city's forecast as CSV or Parquet bytes
+
+    Raises UpstreamUnavailable, possibly after some chunks have been yielded,
+    when upstream stays unavailable; the bytes so far are then incomplete.
+    """
+    frames = export_frames(cities, section, units)
+    if fmt == 'parquet':
+        return stream_parquet(frames, section, units)
+    return stream_csv(frames)
+
+
+def export_filename(section, fmt):
+    return f"forecast-{section}.{fmt}"
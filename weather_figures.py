@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import orjson
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from weather_cards import format_dates
+from weather_units import unit_label
+
+FIGURE_NAMES = ('temperature', 'precipitation', 'uv', 'hourly', 'wind')
+
+# Figure construction is pure Python and holds the GIL. With workers > 0 it
+# runs in a process pool instead, so a burst of lookups on a threaded server
+# uses every core and request threads stay responsive.
+FIGURE_WORKERS = int(os.environ.get('WEATHER_FIGURE_WORKERS', 0))
+FIGURE_DAYS = 7
+FIGURE_HOURS = 24
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def forecast_figures(daily, hourly, current, units='metric'):
+    """The five forecast charts shared by the Dash, Gradio and Streamlit front-ends"""
+    temperature_unit, speed_unit = unit_label('temperature', units), unit_label('speed', units)
+    dates = list(format_dates(daily['time'][:FIGURE_DAYS]))
+    hourly_times = [datetime.fromisoformat(t).strftime('%H:%M') for t in hourly['time'][:FIGURE_HOURS]]
+
+    # Temperature Forecast Chart
+    fig_temp = go.Figure()
+    fig_temp.add_trace(go.Scatter(
+        x=dates, y=daily['temperature_2m_max'][:FIGURE_DAYS],
+        mode='lines+markers',
+        name='High',
+        line=dict(color='#ff7043', width=3),
+        marker=dict(size=10)
+    ))
+    fig_temp.add_trace(go.Scatter(
+        x=dates, y=daily['temperature_2m_min'][:FIGURE_DAYS],
+        mode='lines+markers',
+        name='Low',
+        line=dict(color='#42a5f5', width=3),
+        marker=dict(size=10),
+        fill='tonexty',
+        fillcolor='rgba(100, 149, 237, 0.2)'
+    ))
+    fig_temp.update_layout(
+        title='7-Day Temperature Forecast',
+        xaxis_title='Date',
+        yaxis_title=f'Temperature ({temperature_unit})',
+        hovermode='x unified',
+        height=400
+    )
+
+    # Precipitation Probability Chart
+    fig_precip = go.Figure()
+    fig_precip.add_trace(go.Bar(
+        x=dates,
+        y=daily['precipitation_probability_max'][:FIGURE_DAYS],
+        marker=dict(
+            color=daily['precipitation_probability_max'][:FIGURE_DAYS],
+            colorscale='Blues',
+            showscale=True,
+            colorbar=dict(title="Probability %")
+        ),
+        text=[f"{p}%" for p in daily['precipitation_probability_max'][:FIGURE_DAYS]],
+        textposition='outside'
+    ))
+    fig_precip.update_layout(
+        title='Rain Probability (7 Days)',
+        xaxis_title='Date',
+        yaxis_title='Probability (%)',
+        height=400
+    )
+
+    # UV Index Chart
+    fig_uv = go.Figure()
+    colors = ['#4caf50' if uv <= 2 else '#ffeb3b' if uv <= 5 else '#ff9800' if uv <= 7 else '#f44336'
+              for uv in daily['uv_index_max'][:FIGURE_DAYS]]
+    fig_uv.add_trace(go.Bar(
+        x=dates,
+        y=daily['uv_index_max'][:FIGURE_DAYS],
+        marker=dict(color=colors),
+        text=daily['uv_index_max'][:FIGURE_DAYS],
+        textposition='outside'
+    ))
+    fig_uv.update_layout(
+        title='UV Index (7 Days)',
+        xaxis_title='Date',
+        yaxis_title='UV Index',
+        height=400
+    )
+
+    # 24-Hour Hourly Forecast
+    fig_hourly = make_subplots(
+        rows=2, cols=1,
+        subplot_titles=('Temperature (Next 24 Hours)', 'Wind Speed (Next 24 Hours)'),
+        vertical_spacing=0.15
+    )
+
+    fig_hourly.add_trace(go.Scatter(
+        x=hourly_times,
+        y=hourly['temperature_2m'][:FIGURE_HOURS],
+        mode='lines',
+        name='Temperature',
+        line=dict(color='#ff6b6b', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(255, 107, 107, 0.2)'
+    ), row=1, col=1)
+
+    fig_hourly.add_trace(go.Scatter(
+        x=hourly_times,
+        y=hourly['wind_speed_10m'][:FIGURE_HOURS],
+        mode='lines',
+        name='Wind Speed',
+        line=dict(color='#4ecdc4', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(78, 205, 196, 0.2)'
+    ), row=2, col=1)
+
+    fig_hourly.update_xaxes(title_text="Time", row=2, col=1)
+    fig_hourly.update_yaxes(title_text=f"Temperature ({temperature_unit})", row=1, col=1)
+    fig_hourly.update_yaxes(title_text=f"Wind Speed ({speed_unit})", row=2, col=1)
+    fig_hourly.update_layout(height=600, showlegend=False)
+
+    # Wind Rose (Polar chart for current wind)
+    fig_wind = go.Figure()
+    fig_wind.add_trace(go.Barpolar(
+        r=[current['wind_speed_10m']],
+        theta=[current['wind_direction_10m']],
+        marker=dict(color='#00bcd4', line=dict(color='#006064', width=2)),
+        width=[20],
+        name='Wind'
+    ))
+    fig_wind.update_layout(
+        title='Current Wind Direction & Speed',
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, max(current['wind_speed_10m'] * 1.5, 20)]),
+            angularaxis=dict(direction='clockwise', rotation=90)
+        ),
+        height=400
+    )
+
+    return dict(zip(FIGURE_NAMES, (fig_temp, fig_precip, fig_uv, fig_hourly, fig_wind)))
+
+
+def compact_forecast(forecast, units='metric'):
+    """Only the slices of a Forecast the figures read, serialized for a worker process"""
+    return orjson.dumps({
+        'units': units,
+        'daily': {k: v[:FIGURE_DAYS] for k, v in forecast.daily.items()},
+        'hourly': {k: v[:FIGURE_HOURS] for k, v in forecast.hourly.items()},
+        'current': forecast.current,
+    })
+
+
+def build_figure_dicts(payload):
+    """Build the five figures from a compact forecast and return them as plain plotly dicts"""
+    data = orjson.loads(payload)
+    figures = forecast_figures(data['daily'], data['hourly'], data['current'], data['units'])
+    return {name: fig.to_plotly_json() for name, fig in figures.items()}
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the servers run background threads
+            # that a forked child would inherit mid-flight.
+            _pool = ProcessPoolExecutor(max_workers=FIGURE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def figure_dicts(forecast, units='metric'):
+    """The forecast figures as plotly dicts, built in the process pool when WEATHER_FIGURE_WORKERS is set
+
+    The forecast must already be converted to units; they only pick the labels.
+    """
+    payload = compact_forecast(forecast, units)
+    if FIGURE_WORKERS > 0:
+        return _executor().submit(build_figure_dicts, payload).result()
+    return build_figure_dicts(payload)
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+
+from weather_core import UpstreamUnavailable, get_current_conditions, location_key
+
+logger = logging.getLogger(__name__)
+
+# How often each watched location is refetched, and how often browsers poll
+# the shared result. Polling never reaches upstream, so it can be frequent.
+LIVE_UPDATE_INTERVAL = int(os.environ.get('WEATHER_LIVE_INTERVAL', 300))
+LIVE_POLL_INTERVAL = 30
+
+# A location stops being refreshed when no client has asked for it this long
+SUBSCRIPTION_TTL = 3 * LIVE_UPDATE_INTERVAL
+
+
+class LiveUpdater:
+    """Refresh current conditions for every watched location once per interval
+
+    However many clients watch a location, it costs one upstream lookup per
+    interval; all watched locations are fetched in one batched request.
+    """
+
+    def __init__(self, interval=LIVE_UPDATE_INTERVAL, subscription_ttl=SUBSCRIPTION_TTL):
+        self.interval = interval
+        self.subscription_ttl = subscription_ttl
+        self.version = 0
+        self._watched = {}
+        self._current = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def watch(self, lat, lon):
+        """Subscribe to a location (or renew the subscription) and return its key"""
+        key = location_key(lat, lon)
+        with self._condition:
+            is_new = key not in self._watched
+            self._watched[key] = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='weather-live', daemon=True)
+                self._thread.start()
+            elif is_new:
+                # Wake the loop so a new location does not wait a full interval
+                self._condition.notify_all()
+        return key
+
+    def current(self, key):
+        """Latest (current conditions, fetched_at) for a watched location, or None"""
+        with self._condition:
+            return self._current.get(key)
+
+    def wait_for_update(self, version, timeout):
+        """Block until an update newer than version is published; return the latest version"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version, timeout=timeout)
+            return self.version
+
+    def refresh(self, keys=None):
+        """Fetch the given watched locations (all by default) and publish the result"""
+        now = time.monotonic()
+        with self._condition:
+            for key, last_seen in list(self._watched.items()):
+                if now - last_seen > self.subscription_ttl:
+                    del self._watched[key]
+                    self._current.pop(key, None)
+            keys = [key for key in (keys or self._watched) if key in self._watched]
+
+        if not keys:
+            return
+        try:
+            current = get_current_conditions(keys)
+        except UpstreamUnavailable:
+            logger.warning("Live update skipped: weather service unavailable")
+            return
+
+        fetched_at = time.time()
+        with self._condition:
+            self._current.update({key: (c, fetched_at) for key, c in zip(keys, current)})
+            self.version += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        next_refresh = 0
+        while True:
+            # An unexpected failure skips this round but must not end the thread
+            try:
+                if time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + self.interval
+                    self.refresh()
+
+                # Between full refreshes, fetch only locations that were just added
+                with self._condition:
+                    known = set(self._watched)
+                    self._condition.wait_for(lambda: set(self._watched) - known,
+                                             timeout=max(next_refresh - time.monotonic(), 0))
+                    added = set(self._watched) - known
+                if added:
+                    self.refresh(added)
+            except Exception:
+                logger.exception("Live update failed")
+
+
+live_updater = LiveUpdater()
@@ -0,0 +1,126 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from weather_core import get_forecasts
+from weather_units import convert_section, unit_label
+
+# Overlay variable -> (label, unit kind, colorscale)
+MAP_OVERLAYS = {
+    'temperature_2m': ('Temperature now', 'temperature', 'RdYlBu_r'),
+    'precipitation_sum': ('Precipitation today', 'precipitation', 'Blues'),
+}
+
+# (lat_min, lat_max, lon_min, lon_max) shown before the map is first moved
+DEFAULT_BOUNDS = (35.0, 70.0, -15.0, 35.0)
+DEFAULT_ZOOM = 3
+
+# Overlay grid spacings in degrees. The grid snaps to the smallest spacing
+# that keeps it within GRID_POINTS_PER_AXIS points per axis, so a viewport
+# costs one batched request and panning reuses cached grid points.
+GRID_STEPS = (0.1, 0.25, 0.5, 1, 2, 2.5, 5, 10, 15, 30)
+GRID_POINTS_PER_AXIS = 7
+
+# Half-width in degrees of the region shown around a point when the front-end
+# cannot report its map viewport
+AREA_SPAN = 5.0
+
+# Invisible markers per axis that make any click on the map land on a point.
+# A click selects the nearest marker, not the exact spot clicked. The lattice
+# spans the visible map and is rebuilt on every pan and zoom, so picks get
+# finer as the map zooms in. Over DEFAULT_BOUNDS the spacing is about 0.9° of
+# latitude by 1.3° of longitude, so a pick is at most about 0.45° by 0.65° off.
+PICK_POINTS_PER_AXIS = 40
+
+
+def viewport_bounds(relayout):
+    """(lat_min, lat_max, lon_min, lon_max) of the visible map from a relayout event, or None"""
+    derived = (relayout or {}).get('map._derived')
+    if not derived:
+        return None
+    lons, lats = np.array(derived['coordinates'], dtype=float).T
+    return (max(float(lats.min()), -85.0), min(float(lats.max()), 85.0), float(lons.min()), float(lons.max()))
+
+
+def area_bounds(lat, lon, span=AREA_SPAN):
+    """Bounds of the square region centred on a point"""
+    return (max(lat - span, -85.0), min(lat + span, 85.0), lon - span, lon + span)
+
+
+def _wrap_longitude(lon):
+    return (np.asarray(lon) + 180) % 360 - 180
+
+
+def _axis(low, high, step):
+    ticks = np.arange(np.ceil(low / step), np.floor(high / step) + 1) * step
+    return ticks if len(ticks) else np.array([np.round((low + high) / 2 / step) * step])
+
+
+def viewport_grid(bounds, points_per_axis=GRID_POINTS_PER_AXIS):
+    """Latitude and longitude arrays of the snapped overlay grid covering bounds"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lon_max = min(lon_max, lon_min + 360 - 1e-9)
+    spacing = max(lat_max - lat_min, lon_max - lon_min) / (points_per_axis - 1)
+    step = next((s for s in GRID_STEPS if s >= spacing), GRID_STEPS[-1])
+    lats, lons = np.meshgrid(_axis(lat_min, lat_max, step), _axis(lon_min, lon_max, step), indexing='ij')
+    return np.round(lats.ravel(), 4), np.round(_wrap_longitude(lons.ravel()), 4)
+
+
+def grid_overlay(bounds, variable, units='metric'):
+    """Overlay values at every grid point of the viewport, fetched through the shared forecast cache"""
+    lats, lons = viewport_grid(bounds)
+    entries = get_forecasts(list(zip(lats.tolist(), lons.tolist())))
+    # Points never fetched before an outage stay blank
+    values = [None if entry is None
+              else entry[0]['current'][variable] if variable in entry[0]['current']
+              else entry[0]['daily'][variable][0]
+              for entry in entries]
+    return lats, lons, convert_section({variable: values}, units)[variable]
+
+
+def map_figure(bounds=None, overlay=None, units='metric', center=None, zoom=DEFAULT_ZOOM, selected=None):
+    """Map panel: clickable everywhere, with an optional forecast overlay for the viewport"""
+    bounds = bounds or DEFAULT_BOUNDS
+    lat_min, lat_max, lon_min, lon_max = bounds
+    pick_lats, pick_lons = np.meshgrid(np.linspace(lat_min, lat_max, PICK_POINTS_PER_AXIS),
+                                       np.linspace(lon_min, lon_max, PICK_POINTS_PER_AXIS), indexing='ij')
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattermap(
+        lat=np.round(pick_lats.ravel(), 4),
+        lon=np.round(_wrap_longitude(pick_lons.ravel()), 4),
+        mode='markers',
+        marker=dict(size=20, opacity=0),
+        hovertemplate='%{lat:.2f}°, %{lon:.2f}°<extra></extra>'
+    ))
+
+    if overlay:
+        label, kind, colorscale = MAP_OVERLAYS[overlay]
+        unit = unit_label(kind, units)
+        lats, lons, values = grid_overlay(bounds, overlay, units)
+        fig.add_trace(go.Scattermap(
+            lat=lats, lon=lons,
+            mode='markers+text',
+            marker=dict(size=28, opacity=0.7, color=values, colorscale=colorscale,
+                        showscale=True, colorbar=dict(title=f"{label} ({unit})")),
+            text=[f"{v:g}" if v is not None else "" for v in values],
+            hovertemplate=f'%{{lat:.2f}}°, %{{lon:.2f}}°: %{{marker.color}} {unit}<extra></extra>'
+        ))
+
+    if selected:
+        fig.add_trace(go.Scattermap(
+            lat=[selected[0]], lon=[selected[1]],
+            mode='markers',
+            marker=dict(size=14, color='#e91e63'),
+            hovertemplate='Selected: %{lat:.2f}°, %{lon:.2f}°<extra></extra>'
+        ))
+
+    center = center or ((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+    fig.update_layout(
+        map=dict(style='open-street-map', center=dict(lat=center[0], lon=center[1]), zoom=zoom),
+        # Keep the user's pan and zoom when the overlay is redrawn
+        uirevision='map',
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=500,
+        showlegend=False
+    )
+    return fig
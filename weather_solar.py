@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from weather_cache import weather_cache
+
+# Apparent sunrise/sunset: the sun's upper limb on the horizon, with refraction
+SUNRISE_ZENITH = 90.833
+
+_daylight_cache = weather_cache.namespace('daylight')
+
+
+def utc_offsets(dates, timezone):
+    """UTC offset in minutes at local noon of each date, honouring daylight saving time"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    noon = pd.DatetimeIndex(dates.ravel() + np.timedelta64(12, 'h'))
+    local = noon.tz_localize(timezone, ambiguous='NaT', nonexistent='shift_forward')
+    offsets = (local.tz_localize(None) - local.tz_convert('UTC').tz_localize(None)).total_seconds() / 60
+    return np.nan_to_num(np.asarray(offsets, dtype=float)).reshape(dates.shape)
+
+
+def solar_times(lat, lon, dates, utc_offset_minutes=None):
+    """Sunrise, sunset, solar noon and day length for arrays of (lat, lon, date)
+
+    Uses the NOAA solar position equations. Inputs broadcast against each
+    other; times are local datetime64 values (NaT during polar day or night)
+    and day length is in hours. Without a UTC offset, local mean solar time
+    is used.
+    """
+    lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if utc_offset_minutes is None:
+        utc_offset_minutes = 4 * lon
+    lat, lon, dates, offset = np.broadcast_arrays(lat, lon, dates, np.asarray(utc_offset_minutes, dtype=float))
+
+    # Julian century at local noon
+    days = (dates - np.datetime64('1970-01-01', 'D')).astype(float)
+    jd = days + 2440587.5 + 0.5 - offset / 1440
+    t = (jd - 2451545.0) / 36525
+
+    mean_long = np.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+    mean_anom = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    ecc = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    center = np.radians(np.sin(mean_anom) * (1.914602 - t * (0.004817 + 0.000014 * t))
+                        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * t)
+                        + np.sin(3 * mean_anom) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * t)
+    app_long = mean_long + center - np.radians(0.00569 + 0.00478 * np.sin(omega))
+    obliquity = np.radians(23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+                           + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliquity) * np.sin(app_long))
+
+    y = np.tan(obliquity / 2) ** 2
+    eq_time = 4 * np.degrees(y * np.sin(2 * mean_long) - 2 * ecc * np.sin(mean_anom)
+                             + 4 * ecc * y * np.sin(mean_anom) * np.cos(2 * mean_long)
+                             - 0.5 * y * y * np.sin(4 * mean_long) - 1.25 * ecc * ecc * np.sin(2 * mean_anom))
+
+    phi = np.radians(lat)
+    cos_hour_angle = (np.cos(np.radians(SUNRISE_ZENITH)) / (np.cos(phi) * np.cos(declination))
+                      - np.tan(phi) * np.tan(declination))
+    hour_angle = np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1)))
+    polar = np.abs(cos_hour_angle) > 1
+
+    noon = 720 - 4 * lon - eq_time + offset
+    sunrise = noon - 4 * hour_angle
+    sunset = noon + 4 * hour_angle
+
+    def to_local(minutes, mask):
+        times = dates.astype('datetime64[s]') + np.round(minutes * 60).astype('timedelta64[s]')
+        return np.where(mask, np.datetime64('NaT'), times)
+
+    return {
+        'sunrise': to_local(sunrise, polar),
+        'sunset': to_local(sunset, polar),
+        'solar_noon': to_local(noon, False),
+        'day_length': 8 * hour_angle / 60,
+    }
+
+
+def local_today(timezone):
+    now = pd.Timestamp.now(tz=timezone or 'UTC')
+    return np.datetime64(now.date(), 'D')
+
+
+def sun_summary(lat, lon, timezone):
+    """Today's sun times formatted for display, computed locally without any network call"""
+    today = local_today(timezone)
+    sun = solar_times(lat, lon, [today], utc_offsets([today], timezone) if timezone else None)
+
+    def clock(values):
+        value = values[0]
+        return "—" if np.isnat(value) else pd.Timestamp(value).strftime('%H:%M')
+
+    minutes = int(round(sun['day_length'][0] * 60))
+    return {
+        'sunrise': clock(sun['sunrise']),
+        'sunset': clock(sun['sunset']),
+        'solar_noon': clock(sun['solar_noon']),
+        'day_length': f"{minutes // 60}h {minutes % 60:02d}m",
+    }
+
+
+def daylight_figure(lat, lon, timezone, year=None):
+    """Day length for every day of the year, with today marked"""
+    today = local_today(timezone)
+    year = year or int(str(today)[:4])
+    dates = np.arange(np.datetime64(f'{year}-01-01'), np.datetime64(f'{year + 1}-01-01'), dtype='datetime64[D]')
+    key = (round(lat, 2), round(lon, 2), timezone, year)
+    day_length = _daylight_cache.get(key)
+    if day_length is None:
+        day_length = solar_times(lat, lon, dates, utc_offsets(dates, timezone) if timezone else None)['day_length']
+        _daylight_cache.set(key, day_length)
+    x = pd.DatetimeIndex(dates)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=x, y=day_length,
+        mode='lines',
+        name='Day length',
+        line=dict(color='#ff9800', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(255, 152, 0, 0.2)',
+        hovertemplate='%{x|%b %d}: %{y:.2f} h<extra></extra>'
+    ))
+    if str(today)[:4] == str(year):
+        fig.add_vline(x=pd.Timestamp(today), line=dict(color='#e91e63', dash='dash'))
+    fig.update_layout(
+        title=f'Daylight Hours ({year})',
+        xaxis_title='Date',
+        yaxis_title='Day Length (hours)',
+        yaxis=dict(range=[0, 24]),
+        height=400,
+        showlegend=False
+    )
+    return fig
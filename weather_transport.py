@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlencode
+
+import requests
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FixtureMissing(requests.ConnectionError):
+    """Raised in replay mode when no response was recorded for a request"""
+
+
+def fixture_key(url, params):
+    """Stable name for a request, independent of parameter order"""
+    query = urlencode(sorted((k, str(v)) for k, v in (params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()[:24]
+
+
+def split_locations(params):
+    """Per-location params for a multi-location forecast request, or None for any other request
+
+    Batched forecasts are recorded and replayed one location at a time, so a
+    fixture does not depend on which other locations shared its request.
+    """
+    latitudes = str((params or {}).get('latitude', '')).split(',')
+    longitudes = str((params or {}).get('longitude', '')).split(',')
+    if len(latitudes) < 2 or len(latitudes) != len(longitudes):
+        return None
+    return [{**params, 'latitude': lat, 'longitude': lon} for lat, lon in zip(latitudes, longitudes)]
+
+
+class LiveTransport:
+    """Send requests to Open-Meteo"""
+
+    # Live calls go through the rate limiter and circuit breaker
+    upstream = True
+
+    def get(self, url, params, timeout):
+        return requests.get(url, params=params, timeout=timeout)
+
+
+class RecordingTransport(LiveTransport):
+    """Send requests upstream and save every successful response as a gzipped fixture"""
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _save(self, url, params, body):
+        fixture = {'url': url, 'params': params, 'status': 200, 'body': body}
+        path = os.path.join(self.fixture_dir, f"{fixture_key(url, params)}.json.gz")
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(fixture, f)
+
+    def get(self, url, params, timeout):
+        response = super().get(url, params, timeout)
+        if response.status_code == 200:
+            split = split_locations(params)
+            if split is None:
+                self._save(url, params, response.text)
+            else:
+                for location_params, item in zip(split, response.json()):
+                    self._save(url, location_params, json.dumps(item))
+        return response
+
+
+class ReplayTransport:
+    """Answer requests from recorded fixtures without touching the network
+
+    Fixtures are decompressed once and kept in memory, so repeated requests
+    cost only building the response object.
+    """
+
+    upstream = False
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _load(self, key):
+        with self._lock:
+            if key not in self._bodies:
+                path = os.path.join(self.fixture_dir, f"{key}.json.gz")
+                try:
+                    with gzip.open(path, 'rt', encoding='utf-8') as f:
+                        fixture = json.load(f)
+                except FileNotFoundError:
+                    return None
+                self._bodies[key] = (fixture['status'], fixture['body'].encode('utf-8'))
+            return self._bodies[key]
+
+    def _fixture(self, url, params):
+        key = fixture_key(url, params)
+        fixture = self._load(key)
+        if fixture is None:
+            raise FixtureMissing(f"No fixture {key} for {url} {params}")
+        return fixture
+
+    def get(self, url, params, timeout):
+        split = split_locations(params)
+        if split is None:
+            fixture = self._fixture(url, params)
+        else:
+            # Reassemble the list Open-Meteo returns for several locations
+            bodies = [self._fixture(url, location_params)[1] for location_params in split]
+            fixture = (200, b'[' + b','.join(bodies) + b']')
+
+        response = requests.Response()
+        response.status_code, response._content = fixture
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+
+TRANSPORTS = {
+    'live': LiveTransport,
+    'record': RecordingTransport,
+    'replay': ReplayTransport,
+}
+
+_transport = None
+
+
+def get_transport():
+    """The active transport, chosen by WEATHER_TRANSPORT (live, record or replay) on first use"""
+    global _transport
+    if _transport is None:
+        mode = os.environ.get('WEATHER_TRANSPORT', 'live')
+        if mode == 'live':
+            _transport = LiveTransport()
+        else:
+            _transport = TRANSPORTS[mode](os.environ.get('WEATHER_FIXTURES', DEFAULT_FIXTURE_DIR))
+    return _transport
+
+
+def set_transport(transport):
+    global _transport
+    _transport = transport
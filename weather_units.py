@@ -0,0 +1,81 @@
+from dataclasses import replace
+
+import numpy as np
+
+UNIT_SYSTEMS = ('metric', 'imperial')
+
+UNIT_LABELS = {
+    'metric': {'temperature': '°C', 'speed': 'km/h', 'precipitation': 'mm', 'pressure': 'hPa'},
+    'imperial': {'temperature': '°F', 'speed': 'mph', 'precipitation': 'in', 'pressure': 'inHg'},
+}
+
+# Plain-text unit names for column headers, e.g. temperature_2m_fahrenheit
+UNIT_SUFFIXES = {
+    'metric': {'temperature': 'celsius', 'speed': 'kmh', 'precipitation': 'mm', 'pressure': 'hpa'},
+    'imperial': {'temperature': 'fahrenheit', 'speed': 'mph', 'precipitation': 'inch', 'pressure': 'inhg'},
+}
+
+# Open-Meteo variables by the kind of unit they are measured in
+VARIABLE_KINDS = {
+    'temperature_2m': 'temperature',
+    'apparent_temperature': 'temperature',
+    'temperature_2m_max': 'temperature',
+    'temperature_2m_min': 'temperature',
+    'wind_speed_10m': 'speed',
+    'wind_gusts_10m': 'speed',
+    'wind_gusts_10m_max': 'speed',
+    'precipitation': 'precipitation',
+    'rain': 'precipitation',
+    'precipitation_sum': 'precipitation',
+    'pressure_msl': 'pressure',
+}
+
+# Metric -> imperial as (scale, offset, decimals shown)
+IMPERIAL_CONVERSIONS = {
+    'temperature': (9 / 5, 32, 1),
+    'speed': (1 / 1.609344, 0, 1),
+    'precipitation': (1 / 25.4, 0, 2),
+    'pressure': (1 / 33.8639, 0, 2),
+}
+
+
+def unit_label(kind, units='metric'):
+    return UNIT_LABELS[units][kind]
+
+
+def unit_column(name, units='metric'):
+    """Column name for a variable with its unit appended; unitless variables keep their name"""
+    kind = VARIABLE_KINDS.get(name)
+    return name if kind is None else f"{name}_{UNIT_SUFFIXES[units][kind]}"
+
+
+def convert_section(section, units):
+    """Copy of a current/daily/hourly section with every variable in the given units
+
+    Data is fetched and cached in metric only; each variable is converted
+    as one array, with missing values kept as None.
+    """
+    if units == 'metric':
+        return section
+    converted = dict(section)
+    for name, values in section.items():
+        kind = VARIABLE_KINDS.get(name)
+        if kind is None:
+            continue
+        scale, offset, decimals = IMPERIAL_CONVERSIONS[kind]
+        array = np.array(values, dtype=float)
+        result = np.round(array * scale + offset, decimals)
+        converted[name] = np.where(np.isnan(array), None, result).tolist()
+    return converted
+
+
+def convert_forecast(forecast, units):
+    """The forecast in the given unit system; the cached metric Forecast is left untouched"""
+    if units == 'metric':
+        return forecast
+    return replace(
+        forecast,
+        current=convert_section(forecast.current, units),
+        daily=convert_section(forecast.daily, units),
+        hourly=convert_section(forecast.hourly, units),
+    )